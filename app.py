@@ -3,11 +3,18 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 import time
+import uuid
 from services.flight_apis import FlightAggregator
 from utils.helpers import FlightFormatter
+from utils.result_set import FlightResultSet
 from utils.validators import FlightValidator
 from config.settings import AppConfig
 from services.cache_manager import cache_manager
+from services.date_matrix import date_matrix_search
+from services.circuit_breaker import circuit_breakers
+from services.metrics import metrics, snapshot as metrics_snapshot
+from services.price_history import price_history
+from services.price_monitor import price_monitor
 from data.airports import (
     get_continents, 
     get_countries_by_continent, 
@@ -65,14 +72,23 @@ if 'flights' not in st.session_state:
     st.session_state.flights = []
 if 'auto_refresh' not in st.session_state:
     st.session_state.auto_refresh = False
-if 'monitor_routes' not in st.session_state:
-    st.session_state.monitor_routes = []
+if 'monitor_session_id' not in st.session_state:
+    st.session_state.monitor_session_id = uuid.uuid4().hex
+if 'monitored_route_key' not in st.session_state:
+    st.session_state.monitored_route_key = None
+if 'monitor_route' not in st.session_state:
+    st.session_state.monitor_route = None
 if 'origin_iata' not in st.session_state:
     st.session_state.origin_iata = None
 if 'destination_iata' not in st.session_state:
     st.session_state.destination_iata = None
 if 'current_non_stop' not in st.session_state:
     st.session_state.current_non_stop = False
+if 'date_matrix' not in st.session_state:
+    st.session_state.date_matrix = None
+if 'date_matrix_job' not in st.session_state:
+    st.session_state.date_matrix_job = None
+    st.session_state.date_matrix_progress = {'done': 0, 'total': 0}
 
 
 def main():
@@ -300,6 +316,20 @@ def main():
         else:
             return_date = None
         
+        flexible_dates = st.checkbox(
+            "📆 Date Flexibile",
+            help="Compară prețurile pentru zilele din jurul datelor alese"
+        )
+        flex_days = 0
+        if flexible_dates:
+            flex_days = st.slider(
+                "± Zile",
+                min_value=1,
+                max_value=AppConfig.DATE_MATRIX['max_days'],
+                value=min(2, AppConfig.DATE_MATRIX['max_days']),
+                help="Câte zile înainte și după datele alese să fie comparate"
+            )
+        
         st.markdown("---")
         
         # ============== PASSENGERS & CLASS ==============
@@ -409,6 +439,7 @@ def main():
             st.info(f"🔄 Auto-refresh activ: la fiecare **{refresh_interval}**")
         else:
             st.session_state.auto_refresh = False
+            price_monitor.unwatch(st.session_state.monitor_session_id)
         
         st.markdown("---")
         
@@ -420,6 +451,8 @@ def main():
             st.success("✅ Cache șters cu succes!")
             time.sleep(1)
             st.rerun()
+        
+        display_diagnostics()
     
     # ============== MAIN CONTENT AREA ==============
     
@@ -496,7 +529,7 @@ def main():
         st.markdown("---")
     
     # ============== FLIGHT SEARCH ==============
-    if search_button or st.session_state.auto_refresh:
+    if search_button:
         if not can_search:
             return
         
@@ -537,74 +570,354 @@ def main():
         - **Zboruri directe: {'DA ✅' if non_stop else 'NU ❌'}**
         """
         
+        search_params = {
+            'origin': origin,
+            'destination': destination,
+            'departure_date': departure_date.strftime('%Y-%m-%d'),
+            'return_date': return_date.strftime('%Y-%m-%d') if return_date else None,
+            'adults': adults,
+            'cabin_class': cabin_class,
+            'non_stop': non_stop,
+            'max_results': max_results
+        }
+        
         with st.spinner('🔄 Căutăm cele mai bune zboruri...'):
             st.info(search_params_display)
             
-            flights = aggregator.search_all(
-                origin=origin,
-                destination=destination,
-                departure_date=departure_date.strftime('%Y-%m-%d'),
-                return_date=return_date.strftime('%Y-%m-%d') if return_date else None,
-                adults=adults,
-                cabin_class=cabin_class,
-                non_stop=non_stop,
-                max_results=max_results
-            )
+            # Show the best results so far while slower providers still run
+            preview = st.empty()
+            flights = []
+            for update in aggregator.search_stream(**search_params,
+                                                   on_event=render_search_event):
+                if update.done:
+                    flights = update.flights
+                else:
+                    with preview.container():
+                        display_partial_results(update)
+            preview.empty()
         
         st.session_state.flights = flights
         st.session_state.current_non_stop = non_stop  # Save the filter state
         
-        # Add to monitor routes
+        # Price grid for the surrounding dates, searched in the background
+        st.session_state.date_matrix = None
+        st.session_state.date_matrix_job = None
+        if flexible_dates:
+            progress = {'done': 0, 'total': 0}
+            st.session_state.date_matrix_progress = progress
+            st.session_state.date_matrix_job = date_matrix_search.submit(
+                origin, destination,
+                search_params['departure_date'], search_params['return_date'],
+                days=flex_days, adults=adults, cabin_class=cabin_class, non_stop=non_stop,
+                on_progress=lambda done, total: progress.update(done=done, total=total)
+            )
+        
+        # The route the background price monitor refreshes while enabled
+        st.session_state.monitor_route = {
+            'params': search_params,
+            'label': f"{get_airport_name(origin)} → {get_airport_name(destination)}"
+        }
         if enable_monitor:
-            route_key = f"{origin}-{destination}-{departure_date}"
-            route_info = {
-                'route': f"{get_airport_name(origin)} → {get_airport_name(destination)}",
-                'date': departure_date,
-                'key': route_key,
-                'non_stop': non_stop
-            }
-            
-            # Update or add route
-            existing = False
-            for i, r in enumerate(st.session_state.monitor_routes):
-                if r['key'] == route_key:
-                    st.session_state.monitor_routes[i] = route_info
-                    existing = True
-                    break
-            
-            if not existing:
-                st.session_state.monitor_routes.append(route_info)
+            sync_price_monitor()
+            price_monitor.record_result(st.session_state.monitored_route_key, flights)
+    
+    # Follow sidebar changes (interval, enabling after a search) on every run
+    if enable_monitor:
+        sync_price_monitor()
     
     # ============== DISPLAY RESULTS ==============
+    if st.session_state.date_matrix is not None:
+        display_date_matrix(st.session_state.date_matrix)
+    elif st.session_state.date_matrix_job is not None:
+        display_date_matrix_progress()
+    
     if st.session_state.flights:
         current_non_stop = st.session_state.get('current_non_stop', False)
-        display_results(st.session_state.flights, current_non_stop)
+        display_results(st.session_state.flights, current_non_stop,
+                        st.session_state.monitored_route_key)
     elif origin and destination:
         st.info("👆 **Apasă butonul '🔍 CAUTĂ ZBORURI' pentru a începe căutarea**")
     else:
         st.info("👈 **Selectează aeroporturile din sidebar pentru a începe**")
     
     # ============== AUTO-REFRESH LOGIC ==============
-    if st.session_state.auto_refresh and st.session_state.flights:
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        for i in range(st.session_state.refresh_interval):
-            progress = (i + 1) / st.session_state.refresh_interval
-            progress_bar.progress(progress)
-            remaining = st.session_state.refresh_interval - i - 1
-            status_text.info(f"🔄 Auto-refresh în {remaining} secunde...")
-            time.sleep(1)
+    # Rendered whenever monitoring is on: its polls renew the session's lease
+    if st.session_state.auto_refresh:
+        display_monitor_status()
+
+
+def display_diagnostics():
+    """Provider latency, cache hit rates and rate-limit waits of this process"""
+    with st.expander("📊 Diagnosticare"):
+        data = metrics_snapshot()
+        
+        def seconds(value):
+            return f"{value * 1000:.0f} ms" if value is not None else "-"
+        
+        st.markdown("**Furnizori**")
+        if data['providers']:
+            st.dataframe(pd.DataFrame([{
+                'Furnizor': row['provider'],
+                'Cereri': row['requests'],
+                'Erori': f"{row['errors']} ({row['error_rate']:.0%})",
+                'Anulate': row['cancelled'],
+                'Refuzate (circuit)': row['short_circuits'],
+                'p50': seconds(row['p50']),
+                'p95': seconds(row['p95']),
+                'Timeout': seconds(circuit_breakers.get(row['provider']).timeout()),
+                'Hedge': (f"{row['hedges']} ({row['hedge_win_rate']:.0%} câștigate)"
+                          if row['hedges'] else "-"),
+                'Circuit': circuit_breakers.get(row['provider']).state
+            } for row in data['providers']]), hide_index=True, use_container_width=True)
+        else:
+            st.caption("Nicio cerere către furnizori încă")
+        
+        st.markdown("**Cache**")
+        if data['caches']:
+            st.dataframe(pd.DataFrame([{
+                'Cache': row['cache'],
+                'Căutări': row['lookups'],
+                'Rată hit': f"{row['hit_rate']:.0%}",
+                'Niveluri': ', '.join(f"{tier}: {count}" for tier, count in row['tiers'].items())
+            } for row in data['caches']]), hide_index=True, use_container_width=True)
+        else:
+            st.caption("Nicio căutare în cache încă")
+        
+        st.markdown("**Limite de rată**")
+        if data['rate_limits']:
+            st.dataframe(pd.DataFrame([{
+                'API': row['api'],
+                'Așteptări': row['waits'],
+                'Medie': seconds(row['mean_wait']),
+                'p95': seconds(row['p95_wait']),
+                'Refuzate': row['throttled']
+            } for row in data['rate_limits']]), hide_index=True, use_container_width=True)
+        else:
+            st.caption("Nicio verificare a limitelor încă")
         
-        st.rerun()
+        st.download_button("⬇️ Export metrici", metrics.render(),
+                           file_name='metrics.txt', mime='text/plain',
+                           help="Format text Prometheus")
+
+
+def sync_price_monitor():
+    """Watch the last searched route at the interval currently selected.
+    
+    Safe to call on every run: watching again with the same interval
+    changes nothing, a new interval reschedules the route and a new
+    search replaces the previously watched route.
+    """
+    route = st.session_state.monitor_route
+    if route is None:
+        return
+    
+    session_id = st.session_state.monitor_session_id
+    route_key = '-'.join(str(value) for value in route['params'].values())
+    previous_key = st.session_state.monitored_route_key
+    if previous_key is not None and previous_key != route_key:
+        price_monitor.unwatch(session_id, previous_key)
+    
+    price_monitor.watch(session_id, route_key, route['params'],
+                        st.session_state.refresh_interval, label=route['label'])
+    st.session_state.monitored_route_key = route_key
+
+
+@st.fragment(run_every=AppConfig.MONITOR_POLL_INTERVAL)
+def display_monitor_status():
+    """Pick up results refreshed by the background price monitor.
+    
+    Only this fragment reruns on a timer; the search itself runs on the
+    monitor's workers, so no script thread waits for the next refresh.
+    """
+    session_id = st.session_state.monitor_session_id
+    
+    for route in price_monitor.poll(session_id):
+        if route.key == st.session_state.monitored_route_key and route.flights is not None:
+            st.session_state.flights = route.flights
+            st.rerun(scope='app')
+    
+    for route in price_monitor.routes(session_id):
+        last_checked = (datetime.fromtimestamp(route['last_checked']).strftime('%H:%M:%S')
+                        if route['last_checked'] else 'N/A')
+        remaining = int(route['next_run_in'])
+        st.caption(
+            f"🔄 {route['route']} - ultima verificare: {last_checked}, "
+            f"următoarea în {remaining // 60}m {remaining % 60}s"
+        )
+        if route['error']:
+            st.warning(f"⚠️ Ultima actualizare a eșuat: {route['error']}")
+
+
+def render_search_event(event):
+    """Render a progress event emitted by the search core"""
+    data = event.data
+    
+    if event.kind == 'search_started':
+        st.markdown("---")
+        st.markdown("### 🔍 Căutare Zboruri")
+        st.info(f"""
+        **Căutare pentru:**
+        - Rută: {data['origin']} → {data['destination']}
+        - Dată plecare: {data['departure_date']}
+        - Dată întoarcere: {data['return_date'] if data['return_date'] else 'Nu'}
+        - Pasageri: {data['adults']}
+        - Clasă: {data['cabin_class']}
+        - Doar directe: {'Da' if data['non_stop'] else 'Nu'}
+        """)
+    
+    elif event.kind == 'routes_verified':
+        if data['count']:
+            st.success(f"✅ Rută validă: Găsite {data['count']} conexiuni aeriene")
+        elif data['status'] == 'timeout':
+            st.info("ℹ️ Verificare rute întreruptă (timp depășit)")
+        else:
+            st.info("ℹ️ Verificare rute completată")
+    
+    elif event.kind == 'mock_data_loaded':
+        if data['count']:
+            st.success(f"""
+            ✅ **Găsite {data['count']} zboruri!**
+            
+            **Note:**
+            - Zborurile afișate sunt **date demonstrative**
+            - Prețurile sunt **estimate** bazate pe ruta selectată
+            - Pentru rezervări reale, vizitați site-urile companiilor aeriene
+            
+            **Caracteristici:**
+            - Filtrare funcțională (directe/escale)
+            - Sortare după preț
+            - Export date (CSV)
+            - Analiză statistică
+            """)
+        else:
+            st.warning("Nu s-au putut genera date de zbor")
+    
+    elif event.kind == 'mock_data_unavailable':
+        if data['reason'] == 'missing':
+            st.error("❌ Modulul de date nu este disponibil")
+        elif data['reason'] == 'timeout':
+            st.warning("⏱️ Datele de zbor nu au sosit la timp")
+        else:
+            st.error(f"❌ Eroare: {data.get('error')}")
+    
+    elif event.kind == 'flights_collected':
+        st.markdown("---")
+        if data['total']:
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                st.metric("Total Zboruri", data['total'])
+            
+            with col2:
+                st.metric("✈️ Zboruri Directe", data['direct'])
+            
+            with col3:
+                st.metric("🔄 Cu Escale", data['with_stops'])
+    
+    elif event.kind == 'filter_applied':
+        st.info(f"🔍 Filtru aplicat: {data['kept']} zboruri directe din {data['total']} total")
+
+
+@st.fragment(run_every=AppConfig.DATE_MATRIX['poll_interval'])
+def display_date_matrix_progress():
+    """Show the progress of the background flexible-date search until it finishes"""
+    job = st.session_state.date_matrix_job
+    if job is None:
+        return
+    
+    if not job.done():
+        progress = st.session_state.date_matrix_progress
+        total = progress['total']
+        st.progress(progress['done'] / total if total else 0.0,
+                    text=f"📆 Comparăm datele flexibile... {progress['done']}/{total}")
+        return
+    
+    st.session_state.date_matrix_job = None
+    try:
+        st.session_state.date_matrix = job.result()
+    except Exception as e:
+        st.warning(f"⚠️ Căutarea pe date flexibile a eșuat: {e}")
+        return
+    st.rerun(scope='app')
+
+
+def display_date_matrix(matrix):
+    """Display the flexible-date price grid as a heatmap"""
+    
+    import plotly.express as px
+    
+    st.markdown("### 📆 Prețuri pe Date Flexibile")
+    
+    cheapest = matrix.cheapest()
+    if cheapest is None:
+        st.warning("⚠️ Nu am găsit prețuri pentru datele din jur")
+        return
+    
+    departure, return_day, price = cheapest
+    route_text = f"plecare **{departure}**" + (f", întoarcere **{return_day}**" if return_day else "")
+    st.success(f"💡 Cea mai ieftină combinație: {route_text} - **€{price:.2f}**")
+    
+    if matrix.return_dates == [None]:
+        grid = pd.DataFrame({'Preț': matrix.prices[:, 0]}, index=matrix.departure_dates).T
+        labels = {'x': 'Data Plecare', 'y': '', 'color': 'Preț (EUR)'}
+    else:
+        grid = pd.DataFrame(matrix.prices, index=matrix.departure_dates,
+                            columns=matrix.return_dates)
+        labels = {'x': 'Data Întoarcere', 'y': 'Data Plecare', 'color': 'Preț Total (EUR)'}
+    
+    fig = px.imshow(
+        grid,
+        labels=labels,
+        color_continuous_scale='RdYlGn_r',
+        text_auto='.0f',
+        aspect='auto'
+    )
+    fig.update_layout(height=400)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    st.caption(
+        f"🔎 {matrix.legs_searched} căutări noi, {matrix.legs_cached} din cache "
+        f"pentru {matrix.prices.size} combinații de date"
+    )
 
 
-def display_results(flights, non_stop_filter=False):
+def display_partial_results(update):
+    """Display the best-so-far results of a search that is still running"""
+    
+    flights = update.flights
+    price_stats = flights.price_stats()
+    
+    st.caption(f"⏳ Rezultate parțiale - ultima sursă: {update.provider}")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("Găsite Până Acum", update.stats['total'])
+    
+    with col2:
+        st.metric("✈️ Directe", update.stats['direct'])
+    
+    with col3:
+        if price_stats['count']:
+            st.metric("💰 Cel Mai Ieftin", f"€{price_stats['min']:.2f}")
+        else:
+            st.metric("💰 Cel Mai Ieftin", "N/A")
+    
+    df = FlightFormatter.flights_to_dataframe(flights.top_k(10, by='price'))
+    columns = [col for col in ('airline', 'flight_number', 'departure_time',
+                               'duration', 'stops', 'price') if col in df.columns]
+    if columns:
+        st.dataframe(df[columns], hide_index=True, use_container_width=True)
+
+
+def display_results(flights, non_stop_filter=False, route_key=None):
     """Display flight search results"""
     
+    flights = FlightResultSet.from_flights(flights)
+    
     # Statistics before filtering
     total_flights = len(flights)
-    direct_flights_count = len([f for f in flights if f.get('stops', 0) == 0])
+    direct_flights_count = flights.count_direct()
     with_stops_count = total_flights - direct_flights_count
     
     # Show debug info
@@ -627,10 +940,10 @@ def display_results(flights, non_stop_filter=False):
                 st.metric("Filtru", "Toate", delta="Inactiv", delta_color="off")
     
     # Filter results if non-stop was selected
-    original_flights = flights.copy()
+    original_flights = flights
     
     if non_stop_filter:
-        flights = [f for f in flights if f.get('stops', 0) == 0]
+        flights = flights.direct()
         
         if len(flights) < total_flights:
             st.info(f"🔍 **Filtru aplicat:** Afișez {len(flights)} zboruri directe din {total_flights} total")
@@ -667,10 +980,7 @@ def display_results(flights, non_stop_filter=False):
             # Show top 3 flights with stops as suggestion
             if original_flights:
                 st.markdown("### 💡 Cele mai bune zboruri cu escale:")
-                cheapest_with_stops = sorted(
-                    original_flights, 
-                    key=lambda x: x.get('price', float('inf'))
-                )[:3]
+                cheapest_with_stops = original_flights.top_k(3, by='price')
                 
                 for i, flight in enumerate(cheapest_with_stops, 1):
                     stops = flight.get('stops', 0)
@@ -703,41 +1013,40 @@ def display_results(flights, non_stop_filter=False):
     st.markdown("---")
     col1, col2, col3, col4 = st.columns(4)
     
-    prices = [f.get('price', 0) for f in flights if f.get('price')]
+    price_stats = flights.price_stats()
     
     with col1:
-        if prices:
+        if price_stats['count']:
             st.metric(
                 "💰 Cel Mai Ieftin",
-                f"€{min(prices):.2f}",
+                f"€{price_stats['min']:.2f}",
                 help="Cel mai mic preț găsit"
             )
         else:
             st.metric("💰 Cel Mai Ieftin", "N/A")
     
     with col2:
-        if prices:
-            avg_price = sum(prices) / len(prices)
+        if price_stats['count']:
             st.metric(
                 "📊 Preț Mediu",
-                f"€{avg_price:.2f}",
+                f"€{price_stats['mean']:.2f}",
                 help="Prețul mediu al zborurilor"
             )
         else:
             st.metric("📊 Preț Mediu", "N/A")
     
     with col3:
-        if prices:
+        if price_stats['count']:
             st.metric(
                 "💎 Cel Mai Scump",
-                f"€{max(prices):.2f}",
+                f"€{price_stats['max']:.2f}",
                 help="Cel mai mare preț găsit"
             )
         else:
             st.metric("💎 Cel Mai Scump", "N/A")
     
     with col4:
-        direct_in_results = len([f for f in flights if f.get('stops', 0) == 0])
+        direct_in_results = flights.count_direct()
         st.metric(
             "✈️ Zboruri Directe",
             f"{direct_in_results}/{len(flights)}",
@@ -760,7 +1069,7 @@ def display_results(flights, non_stop_filter=False):
         display_best_deals(flights)
     
     with tab3:
-        display_price_analysis(flights)
+        display_price_analysis(flights, route_key)
 
 
 def display_table_view(flights):
@@ -898,7 +1207,7 @@ def display_best_deals(flights):
             st.markdown("---")
 
 
-def display_price_analysis(flights):
+def display_price_analysis(flights, route_key=None):
     """Display price analysis charts"""
     
     st.subheader("📊 Analiză Statistică a Prețurilor")
@@ -910,7 +1219,7 @@ def display_price_analysis(flights):
     import plotly.express as px
     import plotly.graph_objects as go
     
-    df = FlightFormatter.flights_to_dataframe(flights)
+    df = FlightFormatter.flights_to_frame(flights)
     
     if df.empty or 'price' not in df.columns:
         st.warning("⚠️ Nu există date de preț disponibile")
@@ -1007,6 +1316,60 @@ def display_price_analysis(flights):
     
     with col4:
         st.metric("Deviație Standard", f"€{df['price'].std():.2f}")
+    
+    if route_key:
+        display_price_history(route_key)
+
+
+def display_price_history(route_key):
+    """Display price trends recorded by the price monitor"""
+    
+    import plotly.express as px
+    
+    history = price_history.downsample(route_key,
+                                       max_points=AppConfig.PRICE_HISTORY['max_points'])
+    if len(history['ts']) < 2:
+        st.info("📈 Evoluția prețurilor apare după câteva actualizări automate")
+        return
+    
+    st.markdown("#### 📈 Evoluția Prețurilor")
+    
+    trend = pd.DataFrame({
+        'Timp': pd.to_datetime(history['ts'], unit='s', utc=True).tz_convert(None),
+        'Preț Minim': history['min'],
+        'Preț Median': history['median']
+    })
+    fig = px.line(
+        trend,
+        x='Timp',
+        y=['Preț Minim', 'Preț Median'],
+        labels={'value': 'Preț (EUR)', 'variable': ''},
+        markers=True
+    )
+    fig.update_layout(height=400)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Per-airline lines show only the most recent observations
+    max_points = AppConfig.PRICE_HISTORY['max_points']
+    airlines = price_history.query_airlines(route_key)
+    if airlines:
+        by_airline = pd.concat([
+            pd.DataFrame({
+                'Timp': pd.to_datetime(ts[-max_points:], unit='s', utc=True).tz_convert(None),
+                'Preț': prices[-max_points:],
+                'Companie': airline
+            })
+            for airline, (ts, prices) in airlines.items()
+        ])
+        fig = px.line(
+            by_airline,
+            x='Timp',
+            y='Preț',
+            color='Companie',
+            labels={'Preț': 'Cel Mai Mic Preț (EUR)'}
+        )
+        fig.update_layout(height=400)
+        st.plotly_chart(fig, use_container_width=True)
 
 
 if __name__ == "__main__":
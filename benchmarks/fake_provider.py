@@ -0,0 +1,118 @@
+"""Local stand-in for the flight provider APIs, with configurable latency.
+
+Answers the endpoints the providers call (``/flights``, ``/routes``)
+with small deterministic JSON bodies after sleeping ``latency`` seconds
+(plus up to ``jitter``). Errors queued in ``failures`` (status and
+headers, e.g. ``(429, {'Retry-After': '1'})``) are served first, one per
+request, to exercise retries and circuit breakers. Run it standalone with
+``python -m benchmarks.fake_provider --latency 0.2``.
+"""
+import argparse
+import http.server
+import json
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+class _ThreadingServer(http.server.ThreadingHTTPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class FakeProviderServer:
+    """Threaded HTTP server imitating the provider APIs"""
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 latency: float = 0.05, jitter: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self.failures: List[Tuple[int, Dict[str, str]]] = []
+        server = self
+        rng = random.Random(seed)
+        rng_lock = threading.Lock()
+        
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                with rng_lock:
+                    server.requests += 1
+                    delay = server.latency + rng.uniform(0, server.jitter)
+                    status, headers = server.failures.pop(0) if server.failures else (200, {})
+                time.sleep(delay)
+                
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                payload = server.respond(url.path, query) if status == 200 else {'error': status}
+                body = json.dumps(payload).encode('utf-8')
+                try:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up, e.g. a cancelled hedged request
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._server = _ThreadingServer((host, port), Handler)
+        self._thread: Optional[threading.Thread] = None
+    
+    @staticmethod
+    def respond(path: str, query: dict) -> dict:
+        """JSON body for a request path"""
+        dep, arr = query.get('dep_iata', 'OTP'), query.get('arr_iata', 'LHR')
+        if path.endswith('/routes'):
+            return {'response': [
+                {'dep_iata': dep, 'arr_iata': arr, 'airline_iata': code}
+                for code in ('RO', 'W6', 'LH')
+            ]}
+        if path.endswith('/flights'):
+            return {'data': []}
+        return {}
+    
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Host and port the server is bound to"""
+        return self._server.server_address[:2]
+    
+    @property
+    def url(self) -> str:
+        """Base URL to assign to a provider's ``base_url``"""
+        host, port = self.address
+        return f"http://{host}:{port}"
+    
+    def start(self) -> 'FakeProviderServer':
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='fake-provider', daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop serving and release the port"""
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def serve_forever(self):
+        """Serve in the current thread"""
+        self._server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    args = parser.parse_args()
+    
+    server = FakeProviderServer(args.host, args.port, args.latency, args.jitter)
+    print(f"Serving on {server.url}")
+    server.serve_forever()
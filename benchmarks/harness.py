@@ -0,0 +1,176 @@
+"""Benchmark registry, timing, baselines and regression reports."""
+import fnmatch
+import gc
+import json
+import os
+import platform
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class Benchmark:
+    """A timed operation; ``setup`` runs before every repeat, untimed"""
+    
+    def __init__(self, name: str, func: Callable[[Any], Any],
+                 setup: Optional[Callable[[], Any]] = None,
+                 number: int = 1, repeat: int = 5):
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.number = number
+        self.repeat = repeat
+
+
+class BenchmarkResult:
+    """Seconds per operation of every repeat, with summary statistics"""
+    
+    def __init__(self, name: str, samples: List[float], number: int):
+        self.name = name
+        self.samples = samples
+        self.number = number
+    
+    @property
+    def median(self) -> float:
+        return statistics.median(self.samples)
+    
+    @property
+    def best(self) -> float:
+        return min(self.samples)
+    
+    @property
+    def p95(self) -> float:
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'median': self.median,
+            'best': self.best,
+            'p95': self.p95,
+            'repeat': len(self.samples),
+            'number': self.number
+        }
+
+
+class Comparison:
+    """Current result against the baseline of one benchmark"""
+    
+    def __init__(self, name: str, current: float, baseline: Optional[float],
+                 threshold: float):
+        self.name = name
+        self.current = current
+        self.baseline = baseline
+        self.ratio = current / baseline if baseline else None
+        if self.ratio is None:
+            self.status = 'new'
+        elif self.ratio > 1 + threshold:
+            self.status = 'regression'
+        elif self.ratio < 1 - threshold:
+            self.status = 'improvement'
+        else:
+            self.status = 'ok'
+
+
+REGISTRY: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, number: int = 1, repeat: int = 5,
+              setup: Optional[Callable[[], Any]] = None):
+    """Register ``func(state)`` as a benchmark; ``state`` comes from ``setup``"""
+    def decorator(func: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        REGISTRY[name] = Benchmark(name, func, setup, number, repeat)
+        return func
+    return decorator
+
+
+def run_benchmark(bench: Benchmark, repeat: Optional[int] = None) -> BenchmarkResult:
+    """Time one benchmark like ``timeit``: GC off, best clock, per-op seconds"""
+    samples = []
+    for _ in range(repeat or bench.repeat):
+        state = bench.setup() if bench.setup else None
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            for _ in range(bench.number):
+                bench.func(state)
+            elapsed = time.perf_counter() - start
+        finally:
+            if gc_enabled:
+                gc.enable()
+        samples.append(elapsed / bench.number)
+    return BenchmarkResult(bench.name, samples, bench.number)
+
+
+def run_benchmarks(pattern: Optional[str] = None, repeat: Optional[int] = None,
+                   on_result: Optional[Callable[[BenchmarkResult], None]] = None
+                   ) -> Dict[str, BenchmarkResult]:
+    """Run every registered benchmark whose name matches a glob pattern"""
+    results = {}
+    for name, bench in REGISTRY.items():
+        if pattern and not fnmatch.fnmatch(name, pattern):
+            continue
+        results[name] = run_benchmark(bench, repeat)
+        if on_result:
+            on_result(results[name])
+    return results
+
+
+def load_baseline(path: str) -> Dict[str, Dict[str, Any]]:
+    """Benchmark results of a saved baseline (empty if there is none)"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f).get('results', {})
+
+
+def save_baseline(path: str, results: Dict[str, BenchmarkResult]):
+    """Write results, merged into an existing baseline, with machine details"""
+    merged = load_baseline(path)
+    merged.update({name: result.to_dict() for name, result in results.items()})
+    payload = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': f"{platform.system()} {platform.machine()}",
+        'results': merged
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+
+
+def compare(results: Dict[str, BenchmarkResult], baseline: Dict[str, Dict[str, Any]],
+            threshold: float = 0.15) -> List[Comparison]:
+    """Compare medians; a change beyond ``threshold`` (fraction) is flagged"""
+    return [
+        Comparison(name, result.median,
+                   baseline.get(name, {}).get('median'), threshold)
+        for name, result in results.items()
+    ]
+
+
+def _format_seconds(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return '-'
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def format_report(comparisons: List[Comparison]) -> str:
+    """Plain-text table of comparisons, regressions first"""
+    order = {'regression': 0, 'improvement': 1, 'new': 2, 'ok': 3}
+    rows = [('benchmark', 'baseline', 'current', 'change', 'status')]
+    for item in sorted(comparisons, key=lambda c: (order[c.status], c.name)):
+        change = f"{(item.ratio - 1) * 100:+.1f}%" if item.ratio is not None else '-'
+        rows.append((item.name, _format_seconds(item.baseline),
+                     _format_seconds(item.current), change, item.status))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return '\n'.join(
+        '  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+        for row in rows
+    )
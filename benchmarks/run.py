@@ -0,0 +1,70 @@
+"""Run the benchmarks, compare them with a baseline and report regressions.
+    
+    python -m benchmarks.run                    # compare with the baseline
+    python -m benchmarks.run --save             # record a new baseline
+    python -m benchmarks.run --filter 'cache.*' --threshold 0.25
+
+Baselines are machine specific: record one on the machine that will be
+compared against it. Exits with status 1 when a benchmark regressed.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def configure_environment():
+    """Keep benchmark runs away from the app's disk cache and rate limits"""
+    from config.settings import AppConfig
+    
+    AppConfig.DISK_CACHE['path'] = os.path.join(
+        tempfile.mkdtemp(prefix='bench-cache-'), 'flight_cache.sqlite3'
+    )
+    # Throttling would measure the limits, not the code
+    AppConfig.RATE_LIMITS = {name: 10 ** 9 for name in AppConfig.RATE_LIMITS}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filter', help="glob of benchmark names, e.g. 'search.*'")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true', help='write results as the baseline')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='relative change of the median reported (default 0.15)')
+    parser.add_argument('--repeat', type=int, help='override the repeats of every benchmark')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='fake provider latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='extra random fake provider latency in seconds')
+    args = parser.parse_args(argv)
+    
+    configure_environment()
+    from benchmarks import suites
+    from benchmarks.harness import (
+        compare, format_report, load_baseline, run_benchmarks, save_baseline
+    )
+    
+    suites.SETTINGS.update(provider_latency=args.latency, provider_jitter=args.jitter)
+    results = run_benchmarks(
+        args.filter, args.repeat,
+        on_result=lambda result: print(f"  {result.name}: {result.median * 1e3:.3f} ms/op",
+                                       file=sys.stderr)
+    )
+    if not results:
+        print('No benchmark matches the filter', file=sys.stderr)
+        return 2
+    
+    comparisons = compare(results, load_baseline(args.baseline), args.threshold)
+    print(format_report(comparisons))
+    
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+    return 1 if any(item.status == 'regression' for item in comparisons) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""Benchmarks of the cache, airport lookup, results and search pipeline."""
+import itertools
+import tempfile
+
+from benchmarks.harness import benchmark
+
+SEARCH_DATE = '2030-06-14'
+
+# Fake provider behaviour for the search benchmarks (set by the runner)
+SETTINGS = {
+    'provider_latency': 0.05,
+    'provider_jitter': 0.0
+}
+
+_AIRPORT_QUERIES = [
+    'OTP', 'lon', 'London', 'Londn', 'frankfrut', 'Targu Mures', 'cluj',
+    'new york', 'paris charles', 'BCN', 'istanbul', 'tokyo', 'sydny',
+    'rome', 'madrid barajas', 'munchen', 'zurich', 'wien', 'dubai', 'j'
+]
+
+
+# ---- cache ----
+
+def _memory_cache():
+    from services.cache_manager import CacheManager
+    
+    manager = CacheManager(tiers=[])
+    for i in range(1000):
+        manager.set_cached('flight_search', f"key_{i}", [{'price': i}])
+    return {'manager': manager, 'keys': itertools.cycle(f"key_{i}" for i in range(1000))}
+
+
+def _disk_cache():
+    from services.cache_manager import CacheManager
+    from services.disk_cache import DiskCache
+    
+    directory = tempfile.mkdtemp(prefix='bench-disk-')
+    manager = CacheManager(tiers=[DiskCache(f"{directory}/cache.sqlite3")])
+    for i in range(200):
+        manager.set_cached('flight_search', f"key_{i}", [{'price': i}])
+    manager.memory.clear()
+    return {'manager': manager, 'keys': itertools.cycle(f"key_{i}" for i in range(200)),
+            'counter': itertools.count()}
+
+
+@benchmark('cache.memory_get_hit', number=20000, setup=_memory_cache)
+def cache_memory_get_hit(state):
+    state['manager'].get_cached('flight_search', next(state['keys']))
+
+
+@benchmark('cache.memory_set', number=20000, setup=_memory_cache)
+def cache_memory_set(state):
+    state['manager'].set_cached('flight_search', next(state['keys']), [{'price': 1}])
+
+
+@benchmark('cache.get_or_compute_hit', number=20000, setup=_memory_cache)
+def cache_get_or_compute_hit(state):
+    state['manager'].get_or_compute('flight_search', next(state['keys']), list)
+
+
+@benchmark('cache.rate_limit_check', number=20000, setup=_memory_cache)
+def cache_rate_limit_check(state):
+    state['manager'].check_rate_limit('benchmark', max_requests=10 ** 9)
+
+
+@benchmark('cache.disk_get_miss_memory', number=2000, setup=_disk_cache)
+def cache_disk_get(state):
+    manager = state['manager']
+    manager.get_cached('flight_search', next(state['keys']))
+    manager.memory.clear('flight_search')
+
+
+@benchmark('cache.disk_set', number=2000, setup=_disk_cache)
+def cache_disk_set(state):
+    state['manager'].set_cached('flight_search', f"new_{next(state['counter'])}",
+                                [{'price': 1}])
+
+
+# ---- airports ----
+
+def _cold_airport_index():
+    from data.airports import airport_index
+    
+    airport_index._ranked_ids.cache_clear()
+    return _AIRPORT_QUERIES
+
+
+@benchmark('airports.search_cold', number=1, repeat=20, setup=_cold_airport_index)
+def airports_search_cold(queries):
+    from data.airports import search_airport
+    
+    for query in queries:
+        search_airport(query)
+
+
+@benchmark('airports.search_warm', number=50, repeat=10, setup=lambda: _AIRPORT_QUERIES)
+def airports_search_warm(queries):
+    from data.airports import search_airport
+    
+    for query in queries:
+        search_airport(query)
+
+
+@benchmark('airports.get_airport_name', number=20000,
+           setup=lambda: itertools.cycle(['OTP', 'LHR', 'JFK', 'XXX', 'cdg']))
+def airports_get_airport_name(codes):
+    from data.airports import get_airport_name
+    
+    get_airport_name(next(codes))
+
+
+# ---- results ----
+
+def _flights(count: int):
+    def setup():
+        from data.mock_flights import generate_result_set
+        
+        return generate_result_set('OTP', 'JFK', SEARCH_DATE, count, seed=1)
+    return setup
+
+
+@benchmark('results.flights_to_dataframe_10k', repeat=5, setup=_flights(10000))
+def results_flights_to_dataframe(flights):
+    from utils.helpers import FlightFormatter
+    
+    FlightFormatter.flights_to_dataframe(flights)
+
+
+@benchmark('results.flights_to_dataframe_list_10k', repeat=5,
+           setup=lambda: _flights(10000)().to_list())
+def results_flights_to_dataframe_list(flights):
+    from utils.helpers import FlightFormatter
+    
+    FlightFormatter.flights_to_dataframe(flights)
+
+
+@benchmark('results.flights_to_dataframe_per_row_10k', repeat=5,
+           setup=lambda: _flights(10000)().to_list())
+def results_flights_to_dataframe_per_row(flights):
+    """Reference: the original per-row formatting, for before/after comparison"""
+    import pandas as pd
+    from utils.helpers import FlightFormatter
+    
+    df = pd.DataFrame(flights)
+    df['departure_time'] = df['departure_time'].apply(FlightFormatter.format_datetime)
+    df['arrival_time'] = df['arrival_time'].apply(FlightFormatter.format_datetime)
+    df['duration'] = df['duration'].apply(FlightFormatter.format_duration)
+    df['price'] = df['price'].round(2)
+
+
+@benchmark('results.top_k_heap_100k', repeat=5, setup=lambda: _flights(100000)().to_list())
+def results_top_k_heap(flights):
+    from utils.ranking import top_k
+    
+    top_k(flights, 10)
+
+
+@benchmark('results.top_k_columnar_100k', repeat=5, setup=_flights(100000))
+def results_top_k_columnar(flights):
+    flights.top_k(10)
+
+
+@benchmark('results.live_ranking_100k', repeat=5, setup=lambda: _flights(100000)().to_list())
+def results_live_ranking(flights):
+    from utils.ranking import LiveRanking
+    
+    ranking = LiveRanking(50)
+    for start in range(0, len(flights), 10000):
+        ranking.extend(flights[start:start + 10000])
+    ranking.best(50, 'direct')
+
+
+@benchmark('results.mock_generate_100k', repeat=5)
+def results_mock_generate(_):
+    from data.mock_flights import generate_columns
+    
+    generate_columns('OTP', 'JFK', SEARCH_DATE, 100000, seed=1)
+
+
+# ---- search ----
+
+_fake_server = None
+
+
+def _search_setup():
+    """Aggregator wired to the local fake provider server, with a cold cache"""
+    global _fake_server
+    from benchmarks.fake_provider import FakeProviderServer
+    from services.cache_manager import cache_manager
+    from services.flight_apis import FlightAggregator
+    
+    if _fake_server is None:
+        _fake_server = FakeProviderServer(latency=SETTINGS['provider_latency'],
+                                          jitter=SETTINGS['provider_jitter'])
+        _fake_server.start()
+    
+    aggregator = FlightAggregator()
+    aggregator.aviationstack.base_url = f"{_fake_server.url}/v1"
+    aggregator.airlabs.base_url = _fake_server.url
+    cache_manager.clear_cache()
+    return aggregator
+
+
+@benchmark('search.search_all_cold', repeat=10, setup=_search_setup)
+def search_all_cold(aggregator):
+    aggregator.search_all('OTP', 'LHR', SEARCH_DATE, max_results=50)
+
+
+def _warm_search_setup():
+    aggregator = _search_setup()
+    aggregator.search_all('OTP', 'LHR', SEARCH_DATE, max_results=50)
+    return aggregator
+
+
+@benchmark('search.search_all_warm', number=20, repeat=5, setup=_warm_search_setup)
+def search_all_warm(aggregator):
+    aggregator.search_all('OTP', 'LHR', SEARCH_DATE, max_results=50)
+
+
+def _throttled_search_setup():
+    """Cold searches whose first provider requests are all throttled"""
+    from services.circuit_breaker import circuit_breakers
+    
+    aggregator = _search_setup()
+    circuit_breakers.reset()
+    _fake_server.failures[:] = [(429, {'Retry-After': '0'})] * 12
+    return aggregator
+
+
+@benchmark('search.search_all_throttled', repeat=5, setup=_throttled_search_setup)
+def search_all_throttled(aggregator):
+    from services.circuit_breaker import CLOSED, circuit_breakers
+    
+    # Two routes, so the second search is not answered by the negative cache
+    for destination in ('LHR', 'CDG'):
+        aggregator.search_all('OTP', destination, SEARCH_DATE, max_results=50)
+    # Throttling must slow the search down, never open a provider's circuit
+    for name in ('airlabs', 'aviationstack'):
+        state = circuit_breakers.get(name).state
+        if state != CLOSED:
+            raise RuntimeError(f"{name} circuit is {state} after a run of 429 responses")
@@ -1,7 +1,12 @@
 """Configuration settings for the flight search application."""
-import streamlit as st
+import os
 from typing import Dict, Any
 
+try:
+    import streamlit as st
+except ImportError:  # headless use (workers, batch jobs, benchmarks)
+    st = None
+
 class APIConfig:
     """API Configuration Manager"""
     
@@ -35,9 +40,96 @@ class AppConfig:
     CACHE_TTL = {
         'flight_search': 300,  # 5 minutes
         'airport_data': 3600,  # 1 hour
-        'price_monitor': 900   # 15 minutes
+        'price_monitor': 900,  # 15 minutes
+        'negative': 60         # empty or failed lookups (see NegativeResult)
+    }
+    
+    # Cache sizes (maximum entries per cache)
+    CACHE_SIZES = {
+        'flight_search': 500,
+        'airport_data': 1000,
+        'price_monitor': 200
+    }
+    
+    # TTL/size profile used by each named provider cache
+    CACHE_PROFILES = {
+        'skyscanner': 'flight_search',
+        'aviationstack': 'flight_search',
+        'airlabs': 'flight_search',
+        'date_matrix': 'flight_search'
+    }
+    
+    # Number of independently locked shards per cache
+    CACHE_STRIPES = 16
+    
+    # Cache backend shared by replicas: 'memory' keeps everything in this
+    # process, 'remote' adds a Redis-protocol server (see services/kv_server.py)
+    CACHE_BACKEND = {
+        'type': os.environ.get('FLIGHT_CACHE_BACKEND', 'memory'),
+        'url': os.environ.get('FLIGHT_CACHE_URL', 'redis://127.0.0.1:6379/0')
     }
     
+    # Persistent cache tier (survives restarts and redeploys)
+    DISK_CACHE = {
+        'enabled': True,
+        'path': '.cache/flight_cache.sqlite3',
+        'max_bytes': 64 * 1024 * 1024  # 64 MB
+    }
+    
+    # Per-provider deadlines (in seconds)
+    PROVIDER_TIMEOUTS = {
+        'skyscanner': 8,
+        'aviationstack': 8,
+        'airlabs': 5,
+        'mock': 5
+    }
+    
+    # Circuit breaker per provider: opens when, over the last `window` calls,
+    # the share of failures or of slow calls (slower than `slow_call_ratio`
+    # of the provider timeout) reaches its rate; timeouts adapt to
+    # `timeout_multiplier` x recent p95 latency, never below `min_timeout`
+    CIRCUIT_BREAKER = {
+        'window': 20,
+        'min_requests': 5,
+        'error_rate': 0.5,
+        'slow_call_rate': 0.5,
+        'slow_call_ratio': 0.8,
+        'open_seconds': 30,
+        'timeout_multiplier': 1.5,
+        'min_timeout': 1.0
+    }
+    
+    # Retries of failed provider calls (connection errors, timeouts, 429/5xx):
+    # full-jitter exponential backoff or the server's Retry-After
+    RETRY_POLICY = {
+        'max_attempts': 3,
+        'base_delay': 0.25,
+        'max_delay': 4.0,
+        'max_retry_after': 10.0  # longer Retry-After values are not waited for
+    }
+    
+    # Retries one search may spend across all of its provider calls
+    SEARCH_RETRY_BUDGET = 4
+    
+    # Hedged requests for lookups that opt in (idempotent, cacheable GETs):
+    # a duplicate is sent once the original outlives the provider's recent
+    # `quantile` latency, if the rate limit has a token to spare
+    HEDGING = {
+        'enabled': True,
+        'quantile': 0.9,
+        'min_delay': 0.05  # never hedge sooner than this (in seconds)
+    }
+    
+    # Shared HTTP connection pool (kept alive and reused per host)
+    HTTP_POOL = {
+        'limit': 200,
+        'limit_per_host': 32,
+        'keepalive_timeout': 60
+    }
+    
+    # Overall time budget for one search across all providers (in seconds)
+    SEARCH_BUDGET = 8
+    
     # Supported cabin classes
     CABIN_CLASSES = ['ECONOMY', 'PREMIUM_ECONOMY', 'BUSINESS', 'FIRST']
     
@@ -51,3 +143,27 @@ class AppConfig:
         '30 minutes': 1800,
         '1 hour': 3600
     }
+    
+    # Background price monitor: refresh workers, and how long a session may
+    # go without polling before its routes stop being refreshed (in seconds)
+    PRICE_MONITOR = {
+        'max_workers': 4,
+        'session_ttl': 180
+    }
+    
+    # Price history of monitored routes (append-only column files per route)
+    PRICE_HISTORY = {
+        'path': '.cache/price_history',
+        'max_points': 200  # points per trend chart after downsampling
+    }
+    
+    # Flexible-date search: cheapest one-way leg per date, combined into a grid
+    DATE_MATRIX = {
+        'max_days': 3,       # largest ± window offered in the UI
+        'max_parallel': 4,   # leg searches in flight at once
+        'leg_results': 10,   # flights kept per leg search
+        'poll_interval': 1   # seconds between progress checks of a running matrix
+    }
+    
+    # How often an open page checks the monitor for new results (in seconds)
+    MONITOR_POLL_INTERVAL = 30
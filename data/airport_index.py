@@ -0,0 +1,258 @@
+"""Lookup indexes over the airport database, built once at import time."""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r'\w+')
+
+# Letters that carry no combining mark in Unicode decomposition
+_FOLD_TABLE = str.maketrans({
+    'ø': 'o', 'ł': 'l', 'đ': 'd', 'æ': 'ae', 'œ': 'oe', 'ı': 'i', 'þ': 'th'
+})
+
+# Relevance of a single query word against an airport
+_SCORE_EXACT_WORD = 100
+_SCORE_PREFIX = 60
+_SCORE_FUZZY = 40
+_SCORE_FUZZY_PENALTY = 15  # per edit
+_SCORE_IATA_EXACT = 10000
+_SCORE_IATA_PREFIX = 500
+_SCORE_FULL_NAME = 400
+
+
+def fold_accents(text: str) -> str:
+    """Strip diacritics: 'Târgu Mureș' -> 'Targu Mures'"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def normalize(text: str) -> str:
+    """Normalized form used for indexing and queries (case and accent folded)"""
+    return fold_accents(text.casefold()).translate(_FOLD_TABLE).strip()
+
+
+def max_edits(word: str) -> int:
+    """Typos tolerated in a query word of this length"""
+    if len(word) < 4:
+        return 0
+    if len(word) < 8:
+        return 1
+    return 2
+
+
+def tokenize(text: str) -> List[str]:
+    """Split normalized text into word tokens"""
+    return _TOKEN_RE.findall(normalize(text))
+
+
+class _TrieNode:
+    __slots__ = ('children', 'ids')
+    
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.ids: Dict[int, None] = {}  # insertion-ordered set
+
+
+class PrefixTrie:
+    """Maps every prefix of the inserted words to the ids stored under them.
+    
+    Each node keeps the ids of all words below it, so a prefix query costs
+    O(k) in the prefix length plus the size of the answer.
+    """
+    
+    def __init__(self):
+        self._root = _TrieNode()
+    
+    def insert(self, word: str, item_id: int):
+        """Index ``item_id`` under ``word`` and all of its prefixes"""
+        node = self._root
+        for char in word:
+            node = node.children.setdefault(char, _TrieNode())
+            node.ids[item_id] = None
+    
+    def find(self, prefix: str) -> Dict[int, None]:
+        """Ids of all words starting with ``prefix``"""
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return {}
+        return node.ids
+    
+    def fuzzy_find(self, word: str, max_distance: int) -> Dict[int, int]:
+        """Ids of words with a prefix within ``max_distance`` edits of ``word``.
+        
+        Walks the trie with a Levenshtein row per node and prunes branches
+        that can no longer come within the bound. Returns id -> distance.
+        """
+        results: Dict[int, int] = {}
+        first_row = list(range(len(word) + 1))
+        stack = [(char, child, first_row) for char, child in self._root.children.items()]
+        
+        while stack:
+            char, node, previous = stack.pop()
+            row = [previous[0] + 1]
+            for i in range(1, len(word) + 1):
+                cost = 0 if word[i - 1] == char else 1
+                row.append(min(row[i - 1] + 1, previous[i] + 1, previous[i - 1] + cost))
+            
+            distance = row[-1]
+            if distance <= max_distance:
+                for item_id in node.ids:
+                    if distance < results.get(item_id, max_distance + 1):
+                        results[item_id] = distance
+            if min(row) <= max_distance:
+                stack.extend((c, child, row) for c, child in node.children.items())
+        
+        return results
+
+
+class AirportIndex:
+    """IATA hash, name prefix trie and country/continent inverted lists"""
+    
+    def __init__(self, airports: Dict[str, Dict[str, Dict[str, str]]],
+                 search_cache_size: int = 512):
+        self.records: List[Dict[str, str]] = []
+        self.by_iata: Dict[str, Dict[str, str]] = {}
+        self.by_country: Dict[str, List[Dict[str, str]]] = {}
+        self.by_continent: Dict[str, List[Dict[str, str]]] = {}
+        self.continents: List[str] = sorted(airports.keys())
+        self.countries: Dict[str, List[str]] = {
+            continent: sorted(countries.keys())
+            for continent, countries in airports.items()
+        }
+        self.name_trie = PrefixTrie()
+        self.iata_trie = PrefixTrie()
+        self.word_ids: Dict[str, Dict[int, None]] = {}
+        self.normalized_names: List[str] = []
+        
+        # Recent queries: the quick-search box re-runs on every rerun
+        self._ranked_ids = lru_cache(maxsize=search_cache_size)(self._rank)
+        
+        for continent, countries in airports.items():
+            for country, country_airports in countries.items():
+                for airport_name, iata_code in country_airports.items():
+                    record = {
+                        'continent': continent,
+                        'country': country,
+                        'airport': airport_name,
+                        'iata': iata_code
+                    }
+                    self._add(len(self.records), record)
+    
+    def _add(self, record_id: int, record: Dict[str, str]):
+        self.records.append(record)
+        self.by_iata[record['iata']] = record
+        self.by_country.setdefault(record['country'], []).append(record)
+        self.by_continent.setdefault(record['continent'], []).append(record)
+        self.normalized_names.append(' '.join(tokenize(record['airport'])))
+        for token in tokenize(record['airport']):
+            self.name_trie.insert(token, record_id)
+            self.word_ids.setdefault(token, {})[record_id] = None
+        self.iata_trie.insert(normalize(record['iata']), record_id)
+    
+    def get(self, iata_code: str) -> Optional[Dict[str, str]]:
+        """Record for an IATA code, O(1)"""
+        return self.by_iata.get(iata_code.strip().upper())
+    
+    def display_name(self, iata_code: str) -> str:
+        """'Airport, Country' for a known code, otherwise the code itself"""
+        record = self.get(iata_code)
+        if record is None:
+            return iata_code.upper()
+        return f"{record['airport']}, {record['country']}"
+    
+    def prefix_search(self, query: str) -> List[Dict[str, str]]:
+        """Airports whose IATA code or name words start with the query words.
+        
+        Every query word must prefix some word of the airport name, so
+        "lon heat" finds London Heathrow. Results keep database order.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        
+        ids = self._intersect(self.name_trie.find(token) for token in tokens)
+        if len(tokens) == 1:
+            ids = set(ids) | set(self.iata_trie.find(tokens[0]))
+        return [self.records[record_id] for record_id in sorted(ids)]
+    
+    def search(self, query: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """Ranked, accent-insensitive and typo-tolerant airport search.
+        
+        Exact IATA hits come first, then full-name, whole-word, prefix and
+        finally fuzzy matches; every query word has to match some word of
+        the airport name unless the query is an IATA code or its prefix.
+        """
+        ranked = self._ranked_ids(' '.join(tokenize(query)))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self.records[record_id] for record_id in ranked]
+    
+    def _rank(self, normalized_query: str) -> Tuple[int, ...]:
+        tokens = normalized_query.split()
+        if not tokens:
+            return ()
+        
+        scores: Dict[int, int] = {}
+        for position, token in enumerate(tokens):
+            token_scores = self._score_token(token)
+            if position == 0:
+                scores = token_scores
+            else:
+                scores = {
+                    record_id: score + token_scores[record_id]
+                    for record_id, score in scores.items()
+                    if record_id in token_scores
+                }
+            if not scores:
+                break
+        
+        for record_id in list(scores):
+            if self.normalized_names[record_id] == normalized_query:
+                scores[record_id] += _SCORE_FULL_NAME
+        
+        if len(tokens) == 1 and len(tokens[0]) <= 3:
+            for record_id in self.iata_trie.find(tokens[0]):
+                bonus = (_SCORE_IATA_EXACT
+                         if normalize(self.records[record_id]['iata']) == tokens[0]
+                         else _SCORE_IATA_PREFIX)
+                scores[record_id] = scores.get(record_id, 0) + bonus
+        
+        # Best score first; shorter names, then database order, break ties
+        return tuple(sorted(
+            scores,
+            key=lambda record_id: (-scores[record_id],
+                                   len(self.normalized_names[record_id]),
+                                   record_id)
+        ))
+    
+    def _score_token(self, token: str) -> Dict[int, int]:
+        scores: Dict[int, int] = {}
+        edits = max_edits(token)
+        if edits:
+            for record_id, distance in self.name_trie.fuzzy_find(token, edits).items():
+                scores[record_id] = _SCORE_FUZZY - _SCORE_FUZZY_PENALTY * distance
+        for record_id in self.name_trie.find(token):
+            scores[record_id] = _SCORE_PREFIX
+        for record_id in self.word_ids.get(token, ()):
+            scores[record_id] = _SCORE_EXACT_WORD
+        return scores
+    
+    @staticmethod
+    def _intersect(id_sets: Iterable[Dict[int, None]]) -> set:
+        result: Optional[set] = None
+        for ids in sorted(id_sets, key=len):
+            result = set(ids) if result is None else result.intersection(ids)
+            if not result:
+                break
+        return result or set()
+    
+    def in_country(self, country: str) -> List[Dict[str, str]]:
+        """Airports of a country"""
+        return self.by_country.get(country, [])
+    
+    def in_continent(self, continent: str) -> List[Dict[str, str]]:
+        """Airports of a continent"""
+        return self.by_continent.get(continent, [])
@@ -1,4 +1,5 @@
 """Airport database organized by continent and country."""
+from data.airport_index import AirportIndex
 
 AIRPORTS = {
     'Europa': {
@@ -437,16 +438,18 @@ AIRPORTS = {
 }
 
 
+# Lookup indexes, built once at import time
+airport_index = AirportIndex(AIRPORTS)
+
+
 def get_continents():
     """Get list of all continents"""
-    return sorted(AIRPORTS.keys())
+    return list(airport_index.continents)
 
 
 def get_countries_by_continent(continent):
     """Get list of countries in a continent"""
-    if continent in AIRPORTS:
-        return sorted(AIRPORTS[continent].keys())
-    return []
+    return list(airport_index.countries.get(continent, []))
 
 
 def get_airports_by_country(continent, country):
@@ -456,33 +459,27 @@ def get_airports_by_country(continent, country):
     return {}
 
 
-def search_airport(query):
-    """Search airport by name or IATA code"""
-    query = query.upper()
-    results = []
-    
-    for continent, countries in AIRPORTS.items():
-        for country, airports in countries.items():
-            for airport_name, iata_code in airports.items():
-                if query in airport_name.upper() or query in iata_code:
-                    results.append({
-                        'continent': continent,
-                        'country': country,
-                        'airport': airport_name,
-                        'iata': iata_code
-                    })
-    
-    return results
+def get_airport(iata_code):
+    """Get the airport record for an IATA code, or None"""
+    record = airport_index.get(iata_code)
+    return dict(record) if record else None
+
+
+def get_airports_in_country(country):
+    """Get airport records of a country"""
+    return [dict(record) for record in airport_index.in_country(country)]
+
+
+def get_airports_in_continent(continent):
+    """Get airport records of a continent"""
+    return [dict(record) for record in airport_index.in_continent(continent)]
+
+
+def search_airport(query, limit=None):
+    """Search airport by name or IATA code, best matches first"""
+    return [dict(record) for record in airport_index.search(query, limit)]
 
 
 def get_airport_name(iata_code):
     """Get airport full name from IATA code"""
-    iata_code = iata_code.upper()
-    
-    for continent, countries in AIRPORTS.items():
-        for country, airports in countries.items():
-            for airport_name, code in airports.items():
-                if code == iata_code:
-                    return f"{airport_name}, {country}"
-    
-    return iata_code
+    return airport_index.display_name(iata_code)
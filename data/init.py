@@ -1,4 +1,14 @@
 """Data package initialization."""
-from .airports import AIRPORTS, get_countries_by_continent, get_airports_by_country
+from .airports import (
+    AIRPORTS, get_countries_by_continent, get_airports_by_country,
+    get_airport, get_airports_in_country, get_airports_in_continent
+)
+from .mock_flights import (
+    generate_flights, generate_result_set, get_mock_flights, random_routes
+)
 
-__all__ = ['AIRPORTS', 'get_countries_by_continent', 'get_airports_by_country']
+__all__ = [
+    'AIRPORTS', 'get_countries_by_continent', 'get_airports_by_country',
+    'get_airport', 'get_airports_in_country', 'get_airports_in_continent',
+    'generate_flights', 'generate_result_set', 'get_mock_flights', 'random_routes'
+]
@@ -0,0 +1,259 @@
+"""Deterministic synthetic flights, for demos, benchmarks and load tests.
+
+Everything is generated column-wise with NumPy from a seed derived from
+the route, date, cabin and caller seed, so the same inputs always give
+the same flights. ``generate_columns`` produces a million itineraries in
+about a third of a second; turning them into flight dicts
+(``generate_result_set``, ``generate_flights``) costs a few seconds per
+million, so large benchmarks and load tests should stay with the columns.
+"""
+import hashlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data.airports import airport_index
+from utils.result_set import FlightResultSet
+
+# (IATA code, name, fare level) of the carriers flying from each continent
+CARRIERS = {
+    'Europa': [
+        ('RO', 'TAROM', 'full'), ('W6', 'Wizz Air', 'low'), ('FR', 'Ryanair', 'low'),
+        ('LH', 'Lufthansa', 'full'), ('AF', 'Air France', 'full'), ('KL', 'KLM', 'full'),
+        ('BA', 'British Airways', 'full'), ('TK', 'Turkish Airlines', 'full'),
+        ('LO', 'LOT Polish Airlines', 'full'), ('OS', 'Austrian Airlines', 'full')
+    ],
+    'America de Nord': [
+        ('DL', 'Delta Air Lines', 'full'), ('UA', 'United Airlines', 'full'),
+        ('AA', 'American Airlines', 'full'), ('AC', 'Air Canada', 'full'),
+        ('B6', 'JetBlue', 'low')
+    ],
+    'Asia': [
+        ('EK', 'Emirates', 'premium'), ('QR', 'Qatar Airways', 'premium'),
+        ('SQ', 'Singapore Airlines', 'premium'), ('NH', 'ANA', 'full'),
+        ('CX', 'Cathay Pacific', 'full'), ('AK', 'AirAsia', 'low')
+    ],
+    'Africa': [
+        ('ET', 'Ethiopian Airlines', 'full'), ('MS', 'EgyptAir', 'full'),
+        ('AT', 'Royal Air Maroc', 'full'), ('SA', 'South African Airways', 'full')
+    ],
+    'America de Sud': [
+        ('LA', 'LATAM Airlines', 'full'), ('AV', 'Avianca', 'full'),
+        ('G3', 'GOL', 'low')
+    ],
+    'Oceania': [
+        ('QF', 'Qantas', 'premium'), ('NZ', 'Air New Zealand', 'full'),
+        ('VA', 'Virgin Australia', 'full')
+    ]
+}
+
+FARE_LEVELS = {'low': 0.6, 'full': 1.0, 'premium': 1.25}
+
+CABIN_MULTIPLIERS = {
+    'ECONOMY': 1.0,
+    'PREMIUM_ECONOMY': 1.6,
+    'BUSINESS': 3.2,
+    'FIRST': 5.5
+}
+
+# Block time range (minutes) and stop probabilities (0, 1, 2) per distance class
+ROUTE_CLASSES = {
+    'short': ((45, 100), (0.85, 0.15, 0.0)),
+    'medium': ((100, 260), (0.45, 0.45, 0.10)),
+    'long': ((420, 900), (0.20, 0.60, 0.20))
+}
+
+# Departure banks (hour of day) with their weights
+_DEPARTURE_BANKS = np.array([6.5, 8.0, 11.0, 13.5, 17.0, 19.5, 22.0])
+_BANK_WEIGHTS = np.array([0.16, 0.18, 0.12, 0.12, 0.18, 0.16, 0.08])
+
+# Fare level by weekday, Monday first
+_WEEKDAY_FACTORS = (0.95, 0.9, 0.9, 1.0, 1.15, 1.05, 1.15)
+
+_PRICE_PER_MINUTE = 0.55
+_BASE_FARE = 25.0
+_ROUND_TRIP_FACTOR = 1.8
+
+
+def _seed(*parts: Any) -> int:
+    digest = hashlib.sha256('|'.join(str(part) for part in parts).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+def route_class(origin: str, destination: str) -> str:
+    """'short' within a country, 'medium' within a continent, else 'long'"""
+    first, second = airport_index.get(origin), airport_index.get(destination)
+    if first is None or second is None:
+        return 'medium'
+    if first['country'] == second['country']:
+        return 'short'
+    if first['continent'] == second['continent']:
+        return 'medium'
+    return 'long'
+
+
+def route_carriers(origin: str, destination: str) -> List[Tuple[str, str, str]]:
+    """Carriers of the origin and destination continents"""
+    carriers: List[Tuple[str, str, str]] = []
+    for code in (origin, destination):
+        record = airport_index.get(code)
+        continent = record['continent'] if record else 'Europa'
+        carriers.extend(c for c in CARRIERS.get(continent, CARRIERS['Europa'])
+                        if c not in carriers)
+    return carriers
+
+
+def block_minutes(origin: str, destination: str) -> int:
+    """Non-stop flying time of a route; the same in both directions"""
+    (low, high), _ = ROUTE_CLASSES[route_class(origin, destination)]
+    pair = sorted((origin.upper(), destination.upper()))
+    return low + _seed('block', *pair) % (high - low + 1)
+
+
+def generate_columns(
+    origin: str,
+    destination: str,
+    departure_date: str,
+    count: int,
+    seed: int = 0,
+    cabin_class: str = 'ECONOMY',
+    adults: int = 1,
+    round_trip: bool = False
+) -> Dict[str, np.ndarray]:
+    """``count`` itineraries of one route and day as NumPy columns"""
+    origin, destination = origin.upper(), destination.upper()
+    rng = np.random.default_rng(_seed(origin, destination, departure_date, cabin_class, seed))
+    _, stop_probabilities = ROUTE_CLASSES[route_class(origin, destination)]
+    carriers = route_carriers(origin, destination)
+    
+    airline = rng.integers(0, len(carriers), count).astype(np.int16)
+    flight_no = rng.integers(100, 10000, count)
+    stops = rng.choice(3, size=count, p=stop_probabilities).astype(np.int16)
+    
+    # Departures cluster around banks, on a 5 minute grid within the day
+    banks = rng.choice(_DEPARTURE_BANKS, size=count, p=_BANK_WEIGHTS)
+    departure_minute = np.clip(banks * 60 + rng.normal(0, 40, count), 5 * 60, 23 * 60 + 55)
+    departure_minute = (np.round(departure_minute / 5) * 5).astype(np.int64)
+    
+    # Each stop adds a detour leg and a layover
+    flying = block_minutes(origin, destination) * rng.uniform(0.95, 1.1, count)
+    detours = (rng.uniform(30, 90, (count, 2)) * (np.arange(2) < stops[:, None])).sum(axis=1)
+    layovers = (rng.uniform(45, 300, (count, 2)) * (np.arange(2) < stops[:, None])).sum(axis=1)
+    duration = (np.round((flying + detours + layovers) / 5) * 5).astype(np.int32)
+    
+    day = np.datetime64(departure_date, 'D')
+    departure = day + departure_minute.astype('timedelta64[m]')
+    arrival = departure + duration.astype('timedelta64[m]')
+    
+    fare_level = np.array([FARE_LEVELS[level] for _, _, level in carriers])[airline]
+    weekday = int((day.astype(np.int64) + 3) % 7)  # 1970-01-01 was a Thursday
+    price = ((_BASE_FARE + flying * _PRICE_PER_MINUTE)
+             * fare_level
+             * CABIN_MULTIPLIERS.get(cabin_class, 1.0)
+             * (1 - 0.12 * stops)
+             * _WEEKDAY_FACTORS[weekday]
+             * rng.lognormal(0, 0.18, count)
+             * adults)
+    if round_trip:
+        price *= _ROUND_TRIP_FACTOR
+    
+    return {
+        'airline': airline,
+        'flight_no': flight_no,
+        'stops': stops,
+        'duration_minutes': duration,
+        'departure': departure.astype('datetime64[s]'),
+        'arrival': arrival.astype('datetime64[s]'),
+        'price': np.round(price, 2),
+        'seats_available': rng.integers(1, 10, count).astype(np.int16)
+    }
+
+
+def generate_result_set(
+    origin: str,
+    destination: str,
+    departure_date: str,
+    count: int,
+    seed: int = 0,
+    cabin_class: str = 'ECONOMY',
+    adults: int = 1,
+    return_date: Optional[str] = None
+) -> FlightResultSet:
+    """Synthetic flights as a ``FlightResultSet``, built from the columns directly.
+    
+    The typed columns are reused as they are; the per-flight dicts are
+    what dominates the cost (about 5 s for a million flights).
+    """
+    origin, destination = origin.upper(), destination.upper()
+    columns = generate_columns(origin, destination, departure_date, count, seed,
+                               cabin_class, adults, round_trip=return_date is not None)
+    carriers = route_carriers(origin, destination)
+    codes = np.array([code for code, _, _ in carriers])[columns['airline']]
+    names = np.array([name for _, name, _ in carriers])[columns['airline']]
+    
+    hours, minutes = np.divmod(columns['duration_minutes'], 60)
+    durations = np.char.add(np.char.add(np.char.add('PT', hours.astype(str)), 'H'),
+                            np.char.add(minutes.astype(str), 'M'))
+    flight_numbers = np.char.add(codes, columns['flight_no'].astype(str))
+    departures = np.datetime_as_string(columns['departure'], unit='s')
+    arrivals = np.datetime_as_string(columns['arrival'], unit='s')
+    
+    keys = ('airline', 'flight_number', 'origin', 'destination', 'departure_time',
+            'arrival_time', 'duration', 'stops', 'price', 'currency', 'cabin_class',
+            'seats_available', 'source')
+    rows = zip(names.tolist(), flight_numbers.tolist(), departures.tolist(),
+               arrivals.tolist(), durations.tolist(), columns['stops'].tolist(),
+               columns['price'].tolist(), columns['seats_available'].tolist())
+    flights = [
+        dict(zip(keys, (name, number, origin, destination, departure, arrival, duration,
+                        stops, price, 'EUR', cabin_class, seats, 'mock')))
+        for name, number, departure, arrival, duration, stops, price, seats in rows
+    ]
+    if return_date is not None:
+        for flight in flights:
+            flight['return_date'] = return_date
+    
+    records = np.empty(count, dtype=object)
+    records[:] = flights
+    return FlightResultSet(records, {
+        'price': columns['price'].astype(np.float64),
+        'stops': columns['stops'],
+        'duration_minutes': columns['duration_minutes'],
+        'departure_ts': columns['departure'].astype(np.int64),
+        'arrival_ts': columns['arrival'].astype(np.int64)
+    })
+
+
+def generate_flights(origin: str, destination: str, departure_date: str, count: int,
+                     seed: int = 0, **kwargs) -> List[Dict[str, Any]]:
+    """Synthetic flights as plain dicts"""
+    return generate_result_set(origin, destination, departure_date, count, seed,
+                               **kwargs).to_list()
+
+
+def random_routes(count: int, seed: int = 0,
+                  airports: Optional[Sequence[str]] = None) -> List[Tuple[str, str]]:
+    """Distinct-endpoint routes drawn from the airport database"""
+    codes = np.array(airports or [record['iata'] for record in airport_index.records])
+    rng = np.random.default_rng(_seed('routes', seed))
+    first = rng.integers(0, len(codes), count)
+    second = (first + rng.integers(1, len(codes), count)) % len(codes)
+    return list(zip(codes[first].tolist(), codes[second].tolist()))
+
+
+def get_mock_flights(
+    origin: str,
+    destination: str,
+    departure_date: str,
+    return_date: Optional[str] = None,
+    adults: int = 1,
+    non_stop: bool = False,
+    cabin_class: str = 'ECONOMY',
+    count: Optional[int] = None,
+    seed: int = 0
+) -> List[Dict[str, Any]]:
+    """Demonstration flights for a search (the aggregator applies ``non_stop``)"""
+    if count is None:
+        count = 15 + _seed('count', origin.upper(), destination.upper(), departure_date) % 26
+    return generate_flights(origin, destination, departure_date, count, seed,
+                            cabin_class=cabin_class, adults=adults, return_date=return_date)
@@ -0,0 +1,343 @@
+"""Storage backends behind CacheManager: in-process and networked."""
+import json
+import math
+import queue
+import socket
+import threading
+import time
+import zlib
+from typing import Any, Dict, Hashable, Optional, Tuple
+from urllib.parse import urlparse
+
+from cachetools import TTLCache
+
+from services.resp import RespError, encode_command, read_reply
+
+_MISSING = object()
+
+
+class CacheBackendError(Exception):
+    """A cache backend could not serve a request"""
+
+
+class NegativeResult:
+    """Cached knowledge that a lookup has nothing: distinct from an absent entry.
+    
+    ``reason`` is 'empty' (the source answered with no results), 'error'
+    (it failed) or 'short_circuit' (an open circuit refused the call; never
+    stored); ``value`` is the empty result to hand back to callers.
+    Negative entries live for their own, shorter TTL, tracked by
+    ``expires`` (wall-clock) since the in-process caches have one TTL per
+    cache. Falsy, so code testing ``if cached:`` treats it as no data.
+    """
+    
+    __slots__ = ('reason', 'value', 'expires')
+    
+    def __init__(self, reason: str, value: Any = None, expires: float = 0.0):
+        self.reason = reason
+        self.value = value
+        self.expires = expires
+    
+    def __bool__(self) -> bool:
+        return False
+    
+    def __repr__(self) -> str:
+        return f"NegativeResult({self.reason!r}, {self.value!r})"
+    
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires
+
+
+# JSON marker of a NegativeResult in the serialized tiers
+_NEGATIVE_KEY = '__negative__'
+
+
+def encode_value(value: Any) -> bytes:
+    """Compact serialization: minified JSON, zlib-compressed"""
+    if isinstance(value, NegativeResult):
+        value = {_NEGATIVE_KEY: value.reason, 'value': value.value, 'expires': value.expires}
+    return zlib.compress(json.dumps(value, separators=(',', ':'), default=str).encode('utf-8'))
+
+
+def decode_value(blob: bytes) -> Any:
+    """Inverse of ``encode_value``"""
+    value = json.loads(zlib.decompress(blob).decode('utf-8'))
+    if isinstance(value, dict) and _NEGATIVE_KEY in value:
+        return NegativeResult(value[_NEGATIVE_KEY], value.get('value'), value.get('expires', 0.0))
+    return value
+
+
+class CacheBackend:
+    """Interface for one cache tier.
+    
+    ``shared`` backends are visible to every replica of the app, so
+    CacheManager also keeps rate-limit counters in them.
+    """
+    
+    name = 'backend'
+    shared = False
+    
+    def get(self, cache_name: str, key: str) -> Optional[Any]:
+        """Return a fresh value or None"""
+        raise NotImplementedError
+    
+    def set(self, cache_name: str, key: str, value: Any, ttl: float):
+        """Store a value for ``ttl`` seconds"""
+        raise NotImplementedError
+    
+    def delete(self, cache_name: str, key: str):
+        """Remove one entry"""
+        raise NotImplementedError
+    
+    def clear(self, cache_name: Optional[str] = None):
+        """Remove all entries of one cache, or everything"""
+        raise NotImplementedError
+    
+    def incr(self, key: str, ttl: float) -> int:
+        """Increment a counter that expires ``ttl`` seconds after creation"""
+        raise NotImplementedError
+
+
+class StripedTTLCache:
+    """TTL cache split into shards that are each guarded by their own lock.
+    
+    ``TTLCache`` is not thread-safe, so every shard owns a private
+    ``TTLCache`` and a lock; sessions touching different keys rarely
+    contend.
+    """
+    
+    def __init__(self, maxsize: int, ttl: float, stripes: int = 16):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        shard_size = max(1, math.ceil(maxsize / stripes))
+        self._shards = [TTLCache(maxsize=shard_size, ttl=ttl) for _ in range(stripes)]
+        self._locks = [threading.Lock() for _ in range(stripes)]
+    
+    def _stripe(self, key: Hashable) -> int:
+        return hash(key) % len(self._shards)
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value or ``default``"""
+        index = self._stripe(key)
+        with self._locks[index]:
+            return self._shards[index].get(key, default)
+    
+    def set(self, key: Hashable, value: Any):
+        """Store a value"""
+        index = self._stripe(key)
+        with self._locks[index]:
+            self._shards[index][key] = value
+    
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a key and return its value"""
+        index = self._stripe(key)
+        with self._locks[index]:
+            return self._shards[index].pop(key, default)
+    
+    def clear(self):
+        """Remove every entry"""
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                shard.clear()
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+    
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+    
+    def __setitem__(self, key: Hashable, value: Any):
+        self.set(key, value)
+    
+    def __len__(self) -> int:
+        total = 0
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                total += len(shard)
+        return total
+
+
+class MemoryBackend(CacheBackend):
+    """In-process backend: one lock-striped TTL cache per cache name"""
+    
+    name = 'memory'
+    
+    def __init__(self, stripes: int = 16, default_maxsize: int = 100):
+        self.stripes = stripes
+        self.default_maxsize = default_maxsize
+        self.caches: Dict[str, StripedTTLCache] = {}
+        self._caches_lock = threading.Lock()
+        self._counters: Dict[str, Tuple[int, float]] = {}
+        self._counters_lock = threading.Lock()
+    
+    def get_cache(self, cache_name: str, ttl: float,
+                  maxsize: Optional[int] = None) -> StripedTTLCache:
+        """Get or create the cache for a name"""
+        cache = self.caches.get(cache_name)
+        if cache is not None:
+            return cache
+        
+        with self._caches_lock:
+            if cache_name not in self.caches:
+                self.caches[cache_name] = StripedTTLCache(
+                    maxsize=maxsize or self.default_maxsize, ttl=ttl, stripes=self.stripes
+                )
+            return self.caches[cache_name]
+    
+    def get(self, cache_name: str, key: str) -> Optional[Any]:
+        cache = self.caches.get(cache_name)
+        return cache.get(key) if cache is not None else None
+    
+    def set(self, cache_name: str, key: str, value: Any, ttl: float):
+        self.get_cache(cache_name, ttl).set(key, value)
+    
+    def delete(self, cache_name: str, key: str):
+        cache = self.caches.get(cache_name)
+        if cache is not None:
+            cache.pop(key)
+    
+    def clear(self, cache_name: Optional[str] = None):
+        if cache_name:
+            if cache_name in self.caches:
+                self.caches[cache_name].clear()
+        else:
+            for cache in list(self.caches.values()):
+                cache.clear()
+    
+    def incr(self, key: str, ttl: float) -> int:
+        now = time.monotonic()
+        with self._counters_lock:
+            count, expires_at = self._counters.get(key, (0, 0.0))
+            if expires_at <= now:
+                count, expires_at = 0, now + ttl
+            self._counters[key] = (count + 1, expires_at)
+            return count + 1
+
+
+class RemoteBackend(CacheBackend):
+    """Networked backend for any server speaking the Redis protocol.
+    
+    Keys are namespaced as ``<namespace>:<cache>:<key>`` and values use the
+    same compact encoding as the disk tier. Sockets are pooled and reused.
+    After a connection failure the server is not contacted again for
+    ``retry_after`` seconds; commands fail at once in the meantime.
+    """
+    
+    name = 'remote'
+    shared = True
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 6379, db: int = 0,
+                 namespace: str = 'flight', timeout: float = 0.5, pool_size: int = 8,
+                 retry_after: float = 10.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.namespace = namespace
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._pool: 'queue.LifoQueue' = queue.LifoQueue(maxsize=pool_size)
+        self._down_until = 0.0
+    
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'RemoteBackend':
+        """Build a backend from ``redis://host:port/db``"""
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip('/') or 0)
+        return cls(host=parsed.hostname or '127.0.0.1', port=parsed.port or 6379,
+                   db=db, **kwargs)
+    
+    def _connect(self) -> Tuple[socket.socket, Any]:
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        conn = (sock, sock.makefile('rb'))
+        if self.db:
+            self._send(conn, 'SELECT', self.db)
+        return conn
+    
+    @staticmethod
+    def _send(conn: Tuple[socket.socket, Any], *args) -> Any:
+        sock, reader = conn
+        sock.sendall(encode_command(args))
+        reply = read_reply(reader)
+        if isinstance(reply, RespError):
+            raise CacheBackendError(str(reply))
+        return reply
+    
+    def execute(self, *args) -> Any:
+        """Send one command over a pooled connection and return the reply"""
+        if time.monotonic() < self._down_until:
+            raise CacheBackendError(f"{self.host}:{self.port} is unavailable")
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            try:
+                conn = self._connect()
+            except OSError:
+                self._down_until = time.monotonic() + self.retry_after
+                raise
+        
+        try:
+            reply = self._send(conn, *args)
+        except OSError:
+            # Timeouts and resets: the server is struggling, back off too
+            conn[0].close()
+            self._down_until = time.monotonic() + self.retry_after
+            raise
+        except ValueError:
+            conn[0].close()
+            raise
+        except CacheBackendError:
+            self._release(conn)
+            raise
+        self._release(conn)
+        return reply
+    
+    def _release(self, conn: Tuple[socket.socket, Any]):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn[0].close()
+    
+    def _key(self, cache_name: str, key: str) -> str:
+        return f"{self.namespace}:{cache_name}:{key}"
+    
+    def get(self, cache_name: str, key: str) -> Optional[Any]:
+        blob = self.execute('GET', self._key(cache_name, key))
+        return decode_value(blob) if blob is not None else None
+    
+    def set(self, cache_name: str, key: str, value: Any, ttl: float):
+        self.execute('SET', self._key(cache_name, key), encode_value(value),
+                     'PX', max(1, int(ttl * 1000)))
+    
+    def delete(self, cache_name: str, key: str):
+        self.execute('DEL', self._key(cache_name, key))
+    
+    def clear(self, cache_name: Optional[str] = None):
+        # Only touch our namespace: the server may be shared with other apps
+        pattern = f"{self.namespace}:{cache_name}:*" if cache_name else f"{self.namespace}:*"
+        cursor = b'0'
+        while True:
+            cursor, keys = self.execute('SCAN', cursor, 'MATCH', pattern, 'COUNT', 500)
+            if keys:
+                self.execute('DEL', *keys)
+            if cursor in (b'0', '0'):
+                break
+    
+    def incr(self, key: str, ttl: float) -> int:
+        full_key = f"{self.namespace}:{key}"
+        count = self.execute('INCR', full_key)
+        if count == 1:
+            self.execute('PEXPIRE', full_key, max(1, int(ttl * 1000)))
+        return count
+    
+    def close(self):
+        """Close pooled connections"""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            conn[0].close()
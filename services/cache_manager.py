@@ -1,65 +1,328 @@
 """Cache manager for API responses and rate limiting."""
+import asyncio
+import sqlite3
 import time
-from typing import Dict, Any, Optional
-from cachetools import TTLCache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
 
+from config.settings import AppConfig
+from services.cache_backends import (
+    CacheBackend, CacheBackendError, MemoryBackend, NegativeResult, RemoteBackend,
+    StripedTTLCache
+)
+from services.disk_cache import DiskCache
+from services.metrics import CACHE_LOOKUPS, RATE_LIMIT_CHECKS, RATE_LIMIT_WAIT
+from services.rate_limiter import RateLimiter
+from services.search_key import SearchKey
+from services.single_flight import SingleFlight
+
+# Keys are plain strings or canonical search keys (stored as ``str(key)``)
+CacheKey = Union[str, SearchKey]
+
+# Failures of a cache tier are treated as misses, never as search errors
+_TIER_ERRORS = (CacheBackendError, OSError, sqlite3.Error)
+
+
+def _expired(value: Any) -> bool:
+    return isinstance(value, NegativeResult) and value.expired
+
+
+def _remaining(negative: NegativeResult) -> float:
+    return max(1.0, negative.expires - time.time())
+
+
+def _unwrap(value: Any) -> Any:
+    """The value to hand to callers: a negative entry's empty result"""
+    return value.value if isinstance(value, NegativeResult) else value
+
+
 class CacheManager:
-    """Manages caching and rate limiting for API calls"""
+    """Manages caching and rate limiting for API calls.
+    
+    Safe to share between Streamlit sessions, which each run in their
+    own thread. Concurrent misses on the same key are coalesced into one
+    fetch. Size and TTL of a named cache come from its profile in
+    ``AppConfig.CACHE_PROFILES``, ``AppConfig.CACHE_TTL`` and
+    ``AppConfig.CACHE_SIZES``.
     
-    def __init__(self):
-        self.caches: Dict[str, TTLCache] = {}
-        self.rate_limiters: Dict[str, list] = {}
+    Data lives in an ordered list of tiers: the in-process memory backend
+    first, then optional slower tiers such as a shared ``RemoteBackend``
+    (so replicas share responses and rate-limit state) or the persistent
+    ``DiskCache``. Lookups fall through the tiers and promote hits.
     
-    def get_cache(self, cache_name: str, ttl: int, maxsize: int = 100) -> TTLCache:
+    The async entry points answer memory hits inline and run everything
+    that touches a slower tier (sockets, SQLite) in a worker thread, so
+    a slow or unreachable tier never stalls the shared event loop.
+    """
+    
+    def __init__(self, tiers: Optional[List[CacheBackend]] = None,
+                 stripes: int = AppConfig.CACHE_STRIPES):
+        self.memory = MemoryBackend(stripes=stripes)
+        self.tiers: List[CacheBackend] = [self.memory] + list(tiers or [])
+        self.shared = next((tier for tier in self.tiers if tier.shared), None)
+        self.rate_limiter = RateLimiter()
+        self.single_flight = SingleFlight()
+    
+    @property
+    def caches(self) -> Dict[str, StripedTTLCache]:
+        """In-process caches by name"""
+        return self.memory.caches
+    
+    @staticmethod
+    def cache_settings(cache_name: str) -> Dict[str, int]:
+        """TTL and maximum size configured for a named cache"""
+        profile = AppConfig.CACHE_PROFILES.get(cache_name, cache_name)
+        return {
+            'ttl': AppConfig.CACHE_TTL.get(profile, 300),
+            'maxsize': AppConfig.CACHE_SIZES.get(profile, 100)
+        }
+    
+    def get_cache(self, cache_name: str, ttl: Optional[int] = None,
+                  maxsize: Optional[int] = None) -> StripedTTLCache:
         """Get or create a cache with TTL"""
-        if cache_name not in self.caches:
-            self.caches[cache_name] = TTLCache(maxsize=maxsize, ttl=ttl)
-        return self.caches[cache_name]
+        settings = self.cache_settings(cache_name)
+        return self.memory.get_cache(cache_name, ttl or settings['ttl'],
+                                     maxsize or settings['maxsize'])
+    
+    def get_cached(self, cache_name: str, key: CacheKey, ttl: Optional[int] = None,
+                   supersets: bool = False) -> Optional[Any]:
+        """Retrieve cached data.
+        
+        Returns None if nothing is cached and a (falsy) ``NegativeResult``
+        if the lookup is known to have no results. With ``supersets``, a
+        ``SearchKey`` missing from the cache is answered from a cached
+        broader search when there is one.
+        """
+        value, tier_name = self._lookup(cache_name, str(key), ttl)
+        if value is None and supersets and isinstance(key, SearchKey):
+            value, tier_name = self._lookup_supersets(cache_name, key, ttl)
+        CACHE_LOOKUPS.inc(cache_name, tier_name)
+        return value
     
-    def get_cached(self, cache_name: str, key: str, ttl: int = 300) -> Optional[Any]:
-        """Retrieve cached data"""
+    async def async_get_cached(self, cache_name: str, key: CacheKey, ttl: Optional[int] = None,
+                               supersets: bool = False) -> Optional[Any]:
+        """``get_cached`` that checks memory inline and the slower tiers in a thread"""
+        if len(self.tiers) == 1:
+            return self.get_cached(cache_name, key, ttl, supersets)
+        value = self.get_cache(cache_name, ttl).get(str(key))
+        if value is not None and not _expired(value):
+            CACHE_LOOKUPS.inc(cache_name, self.memory.name)
+            return value
+        return await asyncio.to_thread(self.get_cached, cache_name, key, ttl, supersets)
+    
+    def _lookup_supersets(self, cache_name: str, key: SearchKey,
+                          ttl: Optional[int] = None) -> Tuple[Optional[Any], str]:
+        """Results derived from the first cached superset of ``key``"""
+        for broader in key.supersets():
+            value, _ = self._lookup(cache_name, str(broader), ttl)
+            if isinstance(value, NegativeResult):
+                if value.reason == 'empty':
+                    return value, 'superset'  # nothing broader, so nothing narrower
+            elif value is not None:
+                return key.restrict(value), 'superset'
+        return None, 'miss'
+    
+    def _lookup(self, cache_name: str, key: str,
+                ttl: Optional[int] = None) -> Tuple[Optional[Any], str]:
+        """Value and the name of the tier that held it ('miss' if none did)"""
         cache = self.get_cache(cache_name, ttl)
-        return cache.get(key)
+        value = cache.get(key)
+        if value is not None and not _expired(value):
+            return value, self.memory.name
+        
+        for index, tier in enumerate(self.tiers[1:], start=1):
+            try:
+                value = tier.get(cache_name, key)
+            except _TIER_ERRORS:
+                continue
+            if value is not None and not _expired(value):
+                # Promote into the faster tiers
+                cache.set(key, value)
+                tier_ttl = _remaining(value) if isinstance(value, NegativeResult) else cache.ttl
+                for faster in self.tiers[1:index]:
+                    self._tier_set(faster, cache_name, key, value, tier_ttl)
+                return value, tier.name
+        return None, 'miss'
     
-    def set_cached(self, cache_name: str, key: str, value: Any, ttl: int = 300):
+    def set_cached(self, cache_name: str, key: CacheKey, value: Any, ttl: Optional[int] = None):
         """Store data in cache"""
+        key = str(key)
         cache = self.get_cache(cache_name, ttl)
-        cache[key] = value
+        cache.set(key, value)
+        tier_ttl = _remaining(value) if isinstance(value, NegativeResult) else cache.ttl
+        for tier in self.tiers[1:]:
+            self._tier_set(tier, cache_name, key, value, tier_ttl)
     
-    def check_rate_limit(self, api_name: str, max_requests: int = 10, 
-                        time_window: int = 60) -> bool:
-        """Check if API call is within rate limit"""
-        if api_name not in self.rate_limiters:
-            self.rate_limiters[api_name] = []
+    def set_negative(self, cache_name: str, key: CacheKey, reason: str = 'empty',
+                     value: Any = None, ttl: Optional[int] = None):
+        """Remember that a lookup has no results, for ``CACHE_TTL['negative']`` seconds"""
+        negative_ttl = min(ttl or AppConfig.CACHE_TTL['negative'], AppConfig.CACHE_TTL['negative'])
+        self.set_cached(cache_name, key, NegativeResult(reason, value, time.time() + negative_ttl))
+    
+    def _store(self, cache_name: str, key: str, value: Any, ttl: Optional[int]) -> Any:
+        """Cache a computed value, empty and failed results as negative entries.
         
+        Short-circuited calls are not cached: an entry would outlive the
+        circuit's open window and keep skipping a recovered provider.
+        """
+        if isinstance(value, NegativeResult):
+            if value.reason != 'short_circuit':
+                self.set_negative(cache_name, key, value.reason, value.value, ttl)
+            return value.value
+        if value:
+            self.set_cached(cache_name, key, value, ttl)
+        else:
+            self.set_negative(cache_name, key, 'empty', value, ttl)
+        return value
+    
+    @staticmethod
+    def _tier_set(tier: CacheBackend, cache_name: str, key: str, value: Any, ttl: float):
+        try:
+            tier.set(cache_name, key, value, ttl)
+        except _TIER_ERRORS:
+            pass
+    
+    def get_or_compute(self, cache_name: str, key: CacheKey, compute: Callable[[], Any],
+                       ttl: Optional[int] = None) -> Any:
+        """Return cached data, or compute it once for all concurrent callers.
+        
+        Empty results are cached as negative entries with their own TTL
+        (``CACHE_TTL['negative']``), as are failures that ``compute``
+        reports by returning a ``NegativeResult``; exceptions are not
+        cached. Cached negative entries return their empty value.
+        """
+        cached = self.get_cached(cache_name, key, ttl)
+        if cached is not None:
+            return _unwrap(cached)
+        key = str(key)
+        
+        def compute_and_store():
+            cached, _ = self._lookup(cache_name, key, ttl)
+            if cached is not None:
+                return _unwrap(cached)
+            return self._store(cache_name, key, compute(), ttl)
+        
+        return self.single_flight.do((cache_name, key), compute_and_store)
+    
+    async def get_or_fetch(self, cache_name: str, key: CacheKey,
+                           fetch: Callable[[], Awaitable[Any]],
+                           ttl: Optional[int] = None, supersets: bool = False) -> Any:
+        """Async ``get_or_compute``: identical concurrent misses share one fetch.
+        
+        ``supersets`` also accepts results derived from a broader cached
+        search (see ``get_cached``).
+        """
+        cached = await self.async_get_cached(cache_name, key, ttl, supersets)
+        if cached is not None:
+            return _unwrap(cached)
+        key = str(key)
+        
+        async def fetch_and_store():
+            cached, _ = await asyncio.to_thread(self._lookup, cache_name, key, ttl)
+            if cached is not None:
+                return _unwrap(cached)
+            value = await fetch()
+            if len(self.tiers) == 1:
+                return self._store(cache_name, key, value, ttl)
+            return await asyncio.to_thread(self._store, cache_name, key, value, ttl)
+        
+        return await self.single_flight.do_async((cache_name, key), fetch_and_store)
+    
+    def _shared_delay(self, api_name: str, max_requests: int, time_window: int) -> float:
+        """Seconds until the replica-wide window has room (0 if it has now)"""
+        if self.shared is None:
+            return 0.0
         now = time.time()
-        # Remove old timestamps
-        self.rate_limiters[api_name] = [
-            ts for ts in self.rate_limiters[api_name] 
-            if now - ts < time_window
-        ]
+        window = int(now // time_window)
+        try:
+            count = self.shared.incr(f"ratelimit:{api_name}:{window}", time_window)
+        except _TIER_ERRORS:
+            return 0.0  # fail open: the local bucket still applies
+        if count <= max_requests:
+            return 0.0
+        return (window + 1) * time_window - now
+    
+    async def _async_shared_delay(self, api_name: str, max_requests: int,
+                                  time_window: int) -> float:
+        if self.shared is None:
+            return 0.0
+        return await asyncio.to_thread(self._shared_delay, api_name, max_requests, time_window)
+    
+    def check_rate_limit(self, api_name: str, max_requests: Optional[int] = None,
+                        time_window: int = 60) -> bool:
+        """Check if API call is within rate limit.
         
-        # Check if under limit
-        if len(self.rate_limiters[api_name]) < max_requests:
-            self.rate_limiters[api_name].append(now)
-            return True
-        return False
+        The local token is taken first and given back if the replica-wide
+        window is full, so a refused check costs nothing.
+        """
+        bucket = self.rate_limiter.bucket(api_name, max_requests, time_window)
+        allowed = bucket.try_acquire()
+        if allowed and self._shared_delay(api_name, bucket.capacity, time_window):
+            bucket.release()
+            allowed = False
+        RATE_LIMIT_CHECKS.inc(api_name, 'allowed' if allowed else 'throttled')
+        return allowed
     
-    def wait_for_rate_limit(self, api_name: str, max_requests: int = 10, 
+    async def async_check_rate_limit(self, api_name: str, max_requests: Optional[int] = None,
+                                     time_window: int = 60) -> bool:
+        """``check_rate_limit`` without blocking the event loop on the shared tier"""
+        bucket = self.rate_limiter.bucket(api_name, max_requests, time_window)
+        allowed = bucket.try_acquire()
+        if allowed and await self._async_shared_delay(api_name, bucket.capacity, time_window):
+            bucket.release()
+            allowed = False
+        RATE_LIMIT_CHECKS.inc(api_name, 'allowed' if allowed else 'throttled')
+        return allowed
+    
+    def wait_for_rate_limit(self, api_name: str, max_requests: Optional[int] = None,
                            time_window: int = 60):
         """Wait until rate limit allows next request"""
-        while not self.check_rate_limit(api_name, max_requests, time_window):
-            time.sleep(1)
+        started = time.perf_counter()
+        bucket = self.rate_limiter.bucket(api_name, max_requests, time_window)
+        bucket.acquire()
+        delay = self._shared_delay(api_name, bucket.capacity, time_window)
+        while delay:
+            time.sleep(delay)
+            delay = self._shared_delay(api_name, bucket.capacity, time_window)
+        RATE_LIMIT_WAIT.observe(time.perf_counter() - started, api_name)
+    
+    async def async_wait_for_rate_limit(self, api_name: str, max_requests: Optional[int] = None,
+                                        time_window: int = 60):
+        """Wait until rate limit allows next request without blocking the event loop"""
+        started = time.perf_counter()
+        bucket = self.rate_limiter.bucket(api_name, max_requests, time_window)
+        await bucket.acquire_async()
+        delay = await self._async_shared_delay(api_name, bucket.capacity, time_window)
+        while delay:
+            await asyncio.sleep(delay)
+            delay = await self._async_shared_delay(api_name, bucket.capacity, time_window)
+        RATE_LIMIT_WAIT.observe(time.perf_counter() - started, api_name)
     
     def clear_cache(self, cache_name: Optional[str] = None):
         """Clear specific cache or all caches"""
-        if cache_name:
-            if cache_name in self.caches:
-                self.caches[cache_name].clear()
-        else:
-            for cache in self.caches.values():
-                cache.clear()
+        for tier in self.tiers:
+            try:
+                tier.clear(cache_name)
+            except _TIER_ERRORS:
+                pass
+
+
+def _create_tiers() -> List[CacheBackend]:
+    """Build the slower cache tiers from ``AppConfig.CACHE_BACKEND`` and ``DISK_CACHE``"""
+    tiers: List[CacheBackend] = []
+    
+    if AppConfig.CACHE_BACKEND['type'] == 'remote':
+        tiers.append(RemoteBackend.from_url(AppConfig.CACHE_BACKEND['url']))
+    
+    disk_settings = AppConfig.DISK_CACHE
+    if disk_settings['enabled']:
+        try:
+            tiers.append(DiskCache(disk_settings['path'], disk_settings['max_bytes']))
+        except (OSError, sqlite3.Error):
+            # Read-only or ephemeral filesystems: run without the disk tier
+            pass
+    
+    return tiers
 
 # Global cache manager instance
-cache_manager = CacheManager()
+cache_manager = CacheManager(tiers=_create_tiers())
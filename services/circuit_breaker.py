@@ -0,0 +1,173 @@
+"""Per-provider circuit breakers with timeouts adapted to observed latency."""
+import math
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from config.settings import AppConfig
+from services.metrics import metrics
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+CIRCUIT_TRANSITIONS = metrics.counter(
+    'flight_circuit_transitions_total', 'Circuit breaker state changes', ('provider', 'state')
+)
+
+
+class CircuitOpenError(Exception):
+    """The provider's circuit is open; the call was not attempted"""
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker over a rolling window of calls.
+    
+    The circuit opens when, over the last ``window`` calls (and at least
+    ``min_requests``), the share of failures or of slow calls reaches its
+    threshold. While open every call is refused without I/O; after
+    ``open_seconds`` a single probe is let through (half-open) and its
+    outcome closes or re-opens the circuit.
+    
+    ``timeout`` adapts the request deadline to the p95 latency of recent
+    successful calls, so a provider that normally answers in 300 ms is not
+    given the full configured deadline.
+    """
+    
+    def __init__(self, name: str, timeout: float, window: int = 20, min_requests: int = 5,
+                 error_rate: float = 0.5, slow_call_rate: float = 0.5,
+                 slow_call_ratio: float = 0.8, open_seconds: float = 30,
+                 timeout_multiplier: float = 1.5, min_timeout: float = 1.0):
+        self.name = name
+        self.max_timeout = timeout
+        self.window = window
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.slow_call_rate = slow_call_rate
+        self.slow_call_seconds = slow_call_ratio * timeout
+        self.open_seconds = open_seconds
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min(min_timeout, timeout)
+        self.state = CLOSED
+        self._calls: Deque[Tuple[bool, bool]] = deque(maxlen=window)  # (failed, slow)
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+    
+    def _transition(self, state: str):
+        self.state = state
+        CIRCUIT_TRANSITIONS.inc(self.name, state)
+    
+    def allow(self) -> bool:
+        """Whether a call may go ahead now (an open circuit answers without locking)"""
+        if self.is_open():
+            return False
+        if self.state == CLOSED:
+            return True
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    return False
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+    
+    def record(self, success: bool, latency: float):
+        """Record the outcome of an allowed call"""
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                self._calls.clear()
+                if success and not slow:
+                    self._transition(CLOSED)
+                else:
+                    self._open()
+                    return
+            
+            self._calls.append((not success, slow))
+            if success:
+                self._latencies.append(latency)
+            if self.state == CLOSED and len(self._calls) >= self.min_requests:
+                failures = sum(failed for failed, _ in self._calls) / len(self._calls)
+                slow_calls = sum(slow for _, slow in self._calls) / len(self._calls)
+                if failures >= self.error_rate or slow_calls >= self.slow_call_rate:
+                    self._open()
+    
+    def cancel(self):
+        """Release an allowed call that ended without an outcome (e.g. cancelled)"""
+        with self._lock:
+            self._probing = False
+    
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+        self._transition(OPEN)
+    
+    def latency_quantile(self, q: float) -> Optional[float]:
+        """Quantile of recent successful call latencies (None until ``min_requests``)"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < self.min_requests:
+            return None
+        return latencies[min(len(latencies) - 1, max(0, math.ceil(q * len(latencies)) - 1))]
+    
+    def timeout(self) -> float:
+        """Deadline for the next call: recent p95 latency with headroom, clamped"""
+        p95 = self.latency_quantile(0.95)
+        if p95 is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, p95 * self.timeout_multiplier))
+    
+    def is_open(self) -> bool:
+        """Whether calls are currently being refused (no probe is due yet)"""
+        return self.state == OPEN and time.monotonic() - self._opened_at < self.open_seconds
+    
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a probe through (0 otherwise)"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+    
+    def reset(self):
+        """Close the circuit and forget recorded calls"""
+        with self._lock:
+            self._calls.clear()
+            self._latencies.clear()
+            self._probing = False
+            self.state = CLOSED
+
+
+class CircuitBreakerRegistry:
+    """One breaker per provider, configured from ``AppConfig.CIRCUIT_BREAKER``"""
+    
+    def __init__(self):
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, name: str, timeout: Optional[float] = None) -> CircuitBreaker:
+        """Breaker of a provider, created with its configured timeout on first use"""
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self.breakers.get(name)
+                if breaker is None:
+                    if timeout is None:
+                        timeout = AppConfig.PROVIDER_TIMEOUTS.get(name, 10)
+                    breaker = CircuitBreaker(name, timeout, **AppConfig.CIRCUIT_BREAKER)
+                    self.breakers[name] = breaker
+        return breaker
+    
+    def reset(self):
+        """Close every circuit"""
+        for breaker in list(self.breakers.values()):
+            breaker.reset()
+
+
+# Global circuit breaker registry
+circuit_breakers = CircuitBreakerRegistry()
@@ -0,0 +1,176 @@
+"""Flexible-date search: cheapest price for every departure/return date pair."""
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import AppConfig
+from services.cache_manager import cache_manager
+from services.search_key import SearchKey
+
+# Providers whose results depend on the date; the route-level ones
+# (airlabs, aviationstack) would answer every leg the same and are skipped
+_DATED_PROVIDERS = ('skyscanner', 'mock')
+
+
+class DateMatrix:
+    """Total price grid: rows are departure dates, columns return dates.
+    
+    A one-way matrix has a single ``None`` return column. Cells without a
+    price (no flights, or returning before departing) are NaN.
+    """
+    
+    def __init__(self, departure_dates: List[str], return_dates: List[Optional[str]],
+                 prices: np.ndarray, legs_searched: int = 0, legs_cached: int = 0):
+        self.departure_dates = departure_dates
+        self.return_dates = return_dates
+        self.prices = prices
+        self.legs_searched = legs_searched
+        self.legs_cached = legs_cached
+    
+    def cheapest(self) -> Optional[Tuple[str, Optional[str], float]]:
+        """Departure date, return date and price of the cheapest cell"""
+        if np.isnan(self.prices).all():
+            return None
+        row, col = np.unravel_index(np.nanargmin(self.prices), self.prices.shape)
+        return self.departure_dates[row], self.return_dates[col], float(self.prices[row, col])
+
+
+def date_range(center: str, days: int, earliest: Optional[date] = None) -> List[str]:
+    """ISO dates ``center - days .. center + days``, skipping those before ``earliest``"""
+    middle = datetime.strptime(center, '%Y-%m-%d').date()
+    dates = [middle + timedelta(days=offset) for offset in range(-days, days + 1)]
+    return [d.isoformat() for d in dates if earliest is None or d >= earliest]
+
+
+class DateMatrixSearch:
+    """Builds a ``DateMatrix`` from one-way leg searches.
+    
+    A round trip over N departure and M return dates needs N + M leg
+    searches instead of N x M round-trip searches: every cell is the sum
+    of the cheapest outbound and return leg. Legs are cached through
+    ``cache_manager`` (so overlapping matrices and repeated searches reuse
+    them) and only the uncached ones search the dated providers, up to
+    ``max_parallel`` at a time. Rate limits are left to the providers,
+    which take a token only for requests that reach the network.
+    
+    ``submit`` runs the whole search in the background so the caller (the
+    Streamlit script) is not blocked while the legs run.
+    """
+    
+    def __init__(self, aggregator: Any = None, max_parallel: int = 4):
+        self.aggregator = aggregator
+        self.max_parallel = max(1, max_parallel)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_parallel,
+                                            thread_name_prefix='date-matrix')
+        self._jobs = ThreadPoolExecutor(max_workers=2, thread_name_prefix='date-matrix-job')
+    
+    def _get_aggregator(self) -> Any:
+        if self.aggregator is None:
+            from services.flight_apis import FlightAggregator
+            
+            self.aggregator = FlightAggregator()
+        return self.aggregator
+    
+    @staticmethod
+    def leg_key(origin: str, destination: str, day: str, adults: int,
+                cabin_class: str, non_stop: bool) -> SearchKey:
+        """Cache key of one one-way leg"""
+        return SearchKey(origin, destination, day, None, adults, cabin_class, non_stop)
+    
+    def _search_leg(self, origin: str, destination: str, day: str, adults: int,
+                    cabin_class: str, non_stop: bool) -> Dict[str, Any]:
+        result = self._get_aggregator().search(
+            origin, destination, day, None, adults, cabin_class, non_stop,
+            max_results=AppConfig.DATE_MATRIX['leg_results'], providers=_DATED_PROVIDERS
+        )
+        if not result.flights:
+            return {}
+        return {'price': result.flights.price_stats()['min'], 'count': result.stats['total']}
+    
+    def search(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: str,
+        return_date: Optional[str] = None,
+        days: int = 3,
+        adults: int = 1,
+        cabin_class: str = 'ECONOMY',
+        non_stop: bool = False,
+        on_progress: Optional[Callable[[int, int], None]] = None
+    ) -> DateMatrix:
+        """Search ``departure_date ± days`` (and ``return_date ± days``)"""
+        today = date.today()
+        departure_dates = date_range(departure_date, days, earliest=today)
+        return_dates: List[Optional[str]] = (
+            date_range(return_date, days, earliest=today) if return_date else [None]
+        )
+        
+        legs = [(origin, destination, day) for day in departure_dates]
+        if return_date:
+            legs += [(destination, origin, day) for day in return_dates]
+        
+        # Cached legs cost nothing; only the rest reach the providers
+        leg_prices: Dict[Tuple[str, str, str], Optional[float]] = {}
+        missing = []
+        for leg in legs:
+            cached = cache_manager.get_cached(
+                'date_matrix', self.leg_key(*leg, adults, cabin_class, non_stop)
+            )
+            if cached is not None:
+                # A negative entry: searched recently, no flights
+                leg_prices[leg] = cached['price'] if cached else None
+            else:
+                missing.append(leg)
+        
+        done = len(legs) - len(missing)
+        if on_progress:
+            on_progress(done, len(legs))
+        
+        for start in range(0, len(missing), self.max_parallel):
+            batch = missing[start:start + self.max_parallel]
+            futures = {
+                leg: self._executor.submit(
+                    cache_manager.get_or_compute,
+                    'date_matrix',
+                    self.leg_key(*leg, adults, cabin_class, non_stop),
+                    lambda leg=leg: self._search_leg(*leg, adults, cabin_class, non_stop)
+                )
+                for leg in batch
+            }
+            for leg, future in futures.items():
+                try:
+                    value = future.result()
+                except Exception:
+                    value = None
+                leg_prices[leg] = value['price'] if value else None
+                done += 1
+                if on_progress:
+                    on_progress(done, len(legs))
+        
+        def leg_price_array(leg_origin: str, leg_destination: str,
+                            dates: List[str]) -> np.ndarray:
+            values = [leg_prices.get((leg_origin, leg_destination, day)) for day in dates]
+            return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        
+        outbound = leg_price_array(origin, destination, departure_dates)
+        if return_date:
+            inbound = leg_price_array(destination, origin, return_dates)
+            # ISO dates compare chronologically; returning must come after departing
+            valid = np.array(return_dates)[None, :] > np.array(departure_dates)[:, None]
+            prices = np.where(valid, outbound[:, None] + inbound[None, :], np.nan)
+        else:
+            prices = outbound[:, None]
+        
+        return DateMatrix(departure_dates, return_dates, prices,
+                          legs_searched=len(missing), legs_cached=len(legs) - len(missing))
+    
+    def submit(self, *args: Any, **kwargs: Any) -> Future:
+        """Run ``search`` in the background; the future resolves to its ``DateMatrix``"""
+        return self._jobs.submit(self.search, *args, **kwargs)
+
+
+# Global date matrix search instance
+date_matrix_search = DateMatrixSearch(max_parallel=AppConfig.DATE_MATRIX['max_parallel'])
@@ -0,0 +1,133 @@
+"""Persistent SQLite cache tier that survives restarts and redeploys."""
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from services.cache_backends import CacheBackend, decode_value, encode_value
+
+
+class DiskCache(CacheBackend):
+    """Size-bounded key/value store with per-entry TTLs in one SQLite file.
+    
+    Expiry uses wall-clock time so entries stay valid across restarts.
+    When the stored payload exceeds ``max_bytes``, expired entries are
+    dropped first, then the least recently used ones.
+    """
+    
+    name = 'disk'
+    
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                cache TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (cache, key)
+            ) WITHOUT ROWID
+        ''')
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)'
+        )
+        self._size = self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM entries'
+        ).fetchone()[0]
+    
+    def get(self, cache_name: str, key: str) -> Optional[Any]:
+        """Return a fresh value or None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, expires_at FROM entries WHERE cache = ? AND key = ?',
+                (cache_name, key)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._delete(cache_name, key)
+                return None
+            self._conn.execute(
+                'UPDATE entries SET accessed_at = ? WHERE cache = ? AND key = ?',
+                (now, cache_name, key)
+            )
+        return decode_value(row[0])
+    
+    def set(self, cache_name: str, key: str, value: Any, ttl: float):
+        """Store a value for ``ttl`` seconds"""
+        blob = encode_value(value)
+        now = time.time()
+        with self._lock:
+            self._delete(cache_name, key)
+            self._conn.execute(
+                'INSERT INTO entries (cache, key, value, size, expires_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (cache_name, key, blob, len(blob), now + ttl, now)
+            )
+            self._size += len(blob)
+            if self._size > self.max_bytes:
+                self._evict(now)
+    
+    def delete(self, cache_name: str, key: str):
+        """Remove one entry"""
+        with self._lock:
+            self._delete(cache_name, key)
+    
+    def clear(self, cache_name: Optional[str] = None):
+        """Remove all entries of one cache, or everything"""
+        with self._lock:
+            if cache_name:
+                self._conn.execute('DELETE FROM entries WHERE cache = ?', (cache_name,))
+            else:
+                self._conn.execute('DELETE FROM entries')
+            self._size = self._conn.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM entries'
+            ).fetchone()[0]
+    
+    def _delete(self, cache_name: str, key: str):
+        row = self._conn.execute(
+            'SELECT size FROM entries WHERE cache = ? AND key = ?', (cache_name, key)
+        ).fetchone()
+        if row is not None:
+            self._conn.execute(
+                'DELETE FROM entries WHERE cache = ? AND key = ?', (cache_name, key)
+            )
+            self._size -= row[0]
+    
+    def _evict(self, now: float):
+        self._conn.execute('DELETE FROM entries WHERE expires_at <= ?', (now,))
+        self._size = self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM entries'
+        ).fetchone()[0]
+        
+        # Drop least recently used entries down to 90% of the budget
+        target = self.max_bytes * 0.9
+        while self._size > target:
+            victims = self._conn.execute(
+                'SELECT cache, key, size FROM entries ORDER BY accessed_at LIMIT 64'
+            ).fetchall()
+            if not victims:
+                break
+            self._conn.executemany(
+                'DELETE FROM entries WHERE cache = ? AND key = ?',
+                [(cache_name, key) for cache_name, key, _ in victims]
+            )
+            self._size -= sum(size for _, _, size in victims)
+    
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self._conn.close()
@@ -1,16 +1,164 @@
 """Flight API integrations - WITHOUT Amadeus."""
-import requests
-from typing import List, Dict, Any, Optional
+import asyncio
+import contextvars
+import time
+from functools import partial
+from typing import Callable, Iterator, List, Dict, Any, Optional, Sequence
 from datetime import datetime, timedelta
 from config.settings import APIConfig, AppConfig
+from services.cache_backends import NegativeResult
 from services.cache_manager import cache_manager
-import streamlit as st
+from services.circuit_breaker import CircuitOpenError, circuit_breakers
+from services.http_client import HttpClient, HttpResponse, http_client
+from services.metrics import HEDGED_REQUESTS, PROVIDER_LATENCY, PROVIDER_REQUESTS
+from services.retry import retry_budget, retry_policy
+from services.search_engine import (
+    ProviderOutcome, ProviderTask, SearchEvent, SearchResult, SearchUpdate,
+    search_engine
+)
+from services.search_key import SearchKey
+from utils.ranking import LiveRanking
+from utils.result_set import FlightResultSet
 
 
-class SkyscannerAPI:
+class BaseProvider:
+    """Common async plumbing shared by all flight providers.
+    
+    Each provider implements its search as a coroutine on the shared,
+    pooled HTTP client; the synchronous methods are thin wrappers. Fetches
+    report failures as ``NegativeResult('error', [])`` so that they, like
+    empty answers, are cached briefly instead of re-queried on every rerun.
+    Calls refused by an open circuit report ``NegativeResult('short_circuit',
+    [])``, which is not cached: the breaker already answers them without
+    I/O and decides when the provider is tried again.
+    """
+    
+    name = ''
+    
+    def __init__(self, client: Optional[HttpClient] = None):
+        self.client = client or http_client
+    
+    async def _get_json(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        hedge: bool = False
+    ) -> HttpResponse:
+        """GET a provider endpoint with retries; ``hedge`` opts an idempotent lookup into hedging.
+        
+        Throttling (429), server errors and connection failures are retried
+        by ``retry_policy`` within the current search's retry budget, so a
+        brief episode delays results instead of emptying them.
+        """
+        if hedge and AppConfig.HEDGING['enabled']:
+            return await retry_policy.call(
+                self.name, partial(self._get_json_hedged, url, params, headers)
+            )
+        return await retry_policy.call(self.name, partial(self._request, url, params, headers))
+    
+    async def _get_json_hedged(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> HttpResponse:
+        """Send a duplicate once the request outlives the provider's recent p90.
+        
+        The first successful response wins and the other request is
+        cancelled. The duplicate is only sent if the provider's rate limit
+        has a token right now; without latency history there is no hedge.
+        """
+        delay = circuit_breakers.get(self.name).latency_quantile(AppConfig.HEDGING['quantile'])
+        if delay is None:
+            return await self._request(url, params, headers)
+        
+        primary = asyncio.ensure_future(self._request(url, params, headers))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=max(delay, AppConfig.HEDGING['min_delay']))
+            if done:
+                return primary.result()
+            if not await cache_manager.async_check_rate_limit(self.name):
+                HEDGED_REQUESTS.inc(self.name, 'throttled')
+                return await primary
+            
+            hedge = asyncio.ensure_future(self._request(url, params, headers))
+            tasks.add(hedge)
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        HEDGED_REQUESTS.inc(self.name, 'won' if task is hedge else 'lost')
+                        return task.result()
+                    error = error or task.exception()
+            HEDGED_REQUESTS.inc(self.name, 'failed')
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def _request(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> HttpResponse:
+        """GET a provider endpoint through its circuit breaker, timed per provider.
+        
+        Raises ``CircuitOpenError`` at once, without any I/O, while the
+        provider's circuit is open. The deadline follows the provider's
+        recent p95 latency (see ``CircuitBreaker.timeout``).
+        """
+        breaker = circuit_breakers.get(self.name)
+        if not breaker.allow():
+            PROVIDER_REQUESTS.inc(self.name, 'short_circuit')
+            raise CircuitOpenError(self.name)
+        
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            response = await self.client.get_json(url, params=params, headers=headers,
+                                                  timeout=breaker.timeout())
+            outcome = str(response.status)
+            return response
+        except asyncio.TimeoutError:
+            outcome = 'timeout'
+            raise
+        except asyncio.CancelledError:
+            outcome = 'cancelled'
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            PROVIDER_REQUESTS.inc(self.name, outcome)
+            if outcome == 'cancelled':
+                # A lost hedge's truncated time is not a latency sample
+                breaker.cancel()
+            else:
+                PROVIDER_LATENCY.observe(elapsed, self.name)
+                # Server errors, timeouts and connection failures count against
+                # the provider; throttling (429) is left to the rate limiter
+                breaker.record(outcome.isdigit() and int(outcome) < 500, elapsed)
+    
+    def _check_circuit(self):
+        """Fail fast, before waiting for a rate-limit token, while the circuit is open"""
+        if circuit_breakers.get(self.name).is_open():
+            PROVIDER_REQUESTS.inc(self.name, 'short_circuit')
+            raise CircuitOpenError(self.name)
+    
+    def _run(self, coro) -> Any:
+        """Block on a provider coroutine from synchronous code"""
+        return self.client.run(coro)
+
+
+class SkyscannerAPI(BaseProvider):
     """Skyscanner API via RapidAPI"""
     
-    def __init__(self):
+    name = 'skyscanner'
+    
+    def __init__(self, client: Optional[HttpClient] = None):
+        super().__init__(client)
         self.api_key = APIConfig.get_rapidapi_key()
         self.base_url = "https://skyscanner-api.p.rapidapi.com"
         self.headers = {
@@ -30,29 +178,48 @@ class SkyscannerAPI:
         currency: str = 'EUR'
     ) -> List[Dict[str, Any]]:
         """Search flights using Skyscanner API"""
+        return self._run(self.async_search_flights(
+            origin, destination, departure_date, return_date,
+            adults, cabin_class, non_stop, currency
+        ))
+    
+    async def async_search_flights(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: str,
+        return_date: Optional[str] = None,
+        adults: int = 1,
+        cabin_class: str = 'ECONOMY',
+        non_stop: bool = False,
+        currency: str = 'EUR'
+    ) -> List[Dict[str, Any]]:
+        """Search flights using Skyscanner API (async)"""
         
         # Note: Skyscanner API via RapidAPI might require different endpoints
         # This is a placeholder that will gracefully fail and use mock data
         
-        cache_key = f"sky_{origin}_{destination}_{departure_date}_{return_date}_{adults}_{non_stop}"
-        cached = cache_manager.get_cached('skyscanner', cache_key, 
-                                         AppConfig.CACHE_TTL['flight_search'])
-        if cached:
-            return cached
-        
-        try:
-            # Attempt to call API (this might fail if endpoint is wrong)
-            # We'll catch the error and return empty list
-            return []
-        except Exception as e:
-            return []
+        cache_key = SearchKey(origin, destination, departure_date, return_date,
+                              adults, cabin_class, non_stop, currency)
+        return await cache_manager.get_or_fetch(
+            'skyscanner', cache_key, self._fetch_flights,
+            AppConfig.CACHE_TTL['flight_search'], supersets=True
+        )
+    
+    async def _fetch_flights(self) -> List[Dict[str, Any]]:
+        # No request is made yet: the search falls back to mock data
+        return []
 
 
-class AviationStackAPI:
+class AviationStackAPI(BaseProvider):
     """AviationStack API via RapidAPI"""
     
-    def __init__(self):
+    name = 'aviationstack'
+    
+    def __init__(self, client: Optional[HttpClient] = None):
+        super().__init__(client)
         self.api_key = APIConfig.get_rapidapi_key()
+        self.base_url = "https://aviationstack1.p.rapidapi.com/v1"
         self.headers = {
             'x-rapidapi-key': self.api_key,
             'x-rapidapi-host': 'aviationstack1.p.rapidapi.com'
@@ -64,37 +231,56 @@ class AviationStackAPI:
         destination: str
     ) -> List[Dict[str, Any]]:
         """Search flights using AviationStack"""
+        return self._run(self.async_search_flights(origin, destination))
+    
+    async def async_search_flights(
+        self,
+        origin: str,
+        destination: str
+    ) -> List[Dict[str, Any]]:
+        """Search flights using AviationStack (async)"""
         
-        cache_key = f"avstack_{origin}_{destination}"
-        cached = cache_manager.get_cached('aviationstack', cache_key,
-                                         AppConfig.CACHE_TTL['flight_search'])
-        if cached:
-            return cached
-        
+        cache_key = SearchKey(origin, destination)
+        return await cache_manager.get_or_fetch(
+            'aviationstack', cache_key,
+            partial(self._fetch_flights, origin, destination),
+            AppConfig.CACHE_TTL['flight_search']
+        )
+    
+    async def _fetch_flights(
+        self,
+        origin: str,
+        destination: str
+    ) -> List[Dict[str, Any]]:
         try:
-            url = "https://aviationstack1.p.rapidapi.com/v1/flights"
+            url = f"{self.base_url}/flights"
             
             params = {
                 'dep_iata': origin.upper(),
                 'arr_iata': destination.upper()
             }
             
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
+            response = await self._get_json(url, params=params, headers=self.headers)
             
-            if response.status_code == 200:
-                data = response.json()
+            if response.status == 200:
+                data = response.data
                 return []  # We'll use mock data instead
             else:
-                return []
-                
+                return NegativeResult('error', [])
+        
+        except CircuitOpenError:
+            return NegativeResult('short_circuit', [])
         except Exception:
-            return []
+            return NegativeResult('error', [])
 
 
-class AirLabsAPI:
+class AirLabsAPI(BaseProvider):
     """AirLabs API - Route information"""
     
-    def __init__(self):
+    name = 'airlabs'
+    
+    def __init__(self, client: Optional[HttpClient] = None):
+        super().__init__(client)
         self.api_key = APIConfig.get_airlabs_key()
         self.base_url = "https://airlabs.co/api/v9"
     
@@ -104,17 +290,32 @@ class AirLabsAPI:
         arr_iata: str
     ) -> List[Dict[str, Any]]:
         """Search flight routes"""
+        return self._run(self.async_search_routes(dep_iata, arr_iata))
+    
+    async def async_search_routes(
+        self,
+        dep_iata: str,
+        arr_iata: str
+    ) -> List[Dict[str, Any]]:
+        """Search flight routes (async)"""
         
-        cache_key = f"airlabs_{dep_iata}_{arr_iata}"
-        cached = cache_manager.get_cached('airlabs', cache_key,
-                                         AppConfig.CACHE_TTL['flight_search'])
-        if cached:
-            return cached
-        
-        cache_manager.wait_for_rate_limit('airlabs',
-                                         AppConfig.RATE_LIMITS['airlabs'])
-        
+        cache_key = SearchKey(dep_iata, arr_iata)
+        return await cache_manager.get_or_fetch(
+            'airlabs', cache_key,
+            partial(self._fetch_routes, dep_iata, arr_iata),
+            AppConfig.CACHE_TTL['flight_search']
+        )
+    
+    async def _fetch_routes(
+        self,
+        dep_iata: str,
+        arr_iata: str
+    ) -> List[Dict[str, Any]]:
         try:
+            self._check_circuit()
+            await cache_manager.async_wait_for_rate_limit('airlabs',
+                                                         AppConfig.RATE_LIMITS['airlabs'])
+            
             url = f"{self.base_url}/routes"
             params = {
                 'api_key': self.api_key,
@@ -122,21 +323,18 @@ class AirLabsAPI:
                 'arr_iata': arr_iata.upper()
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            response = await self._get_json(url, params=params, hedge=True)
             
-            if response.status_code == 200:
-                data = response.json()
-                routes = data.get('response', [])
-                
-                cache_manager.set_cached('airlabs', cache_key, routes,
-                                       AppConfig.CACHE_TTL['flight_search'])
-                
-                return routes
+            if response.status == 200:
+                data = response.data or {}
+                return data.get('response', [])
             else:
-                return []
-                
+                return NegativeResult('error', [])
+        
+        except CircuitOpenError:
+            return NegativeResult('short_circuit', [])
         except Exception:
-            return []
+            return NegativeResult('error', [])
 
 
 class FlightAggregator:
@@ -159,105 +357,192 @@ class FlightAggregator:
         adults: int = 1,
         cabin_class: str = 'ECONOMY',
         non_stop: bool = False,
-        max_results: int = 50
-    ) -> List[Dict[str, Any]]:
+        max_results: int = 50,
+        on_event: Optional[Callable[[SearchEvent], None]] = None
+    ) -> FlightResultSet:
         """Search flights - primarily using mock data"""
+        return self.search(
+            origin, destination, departure_date, return_date, adults,
+            cabin_class, non_stop, max_results, on_event
+        ).flights
+    
+    def search(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: str,
+        return_date: Optional[str] = None,
+        adults: int = 1,
+        cabin_class: str = 'ECONOMY',
+        non_stop: bool = False,
+        max_results: int = 50,
+        on_event: Optional[Callable[[SearchEvent], None]] = None,
+        providers: Optional[Sequence[str]] = None
+    ) -> SearchResult:
+        """Search all providers and report progress through events.
+        
+        Has no UI dependencies: callers such as the Streamlit app, workers
+        or benchmarks subscribe to progress with ``on_event``.
+        """
+        for update in self.search_stream(
+            origin, destination, departure_date, return_date, adults,
+            cabin_class, non_stop, max_results, on_event, providers
+        ):
+            if update.done:
+                return update.result
+    
+    def search_stream(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: str,
+        return_date: Optional[str] = None,
+        adults: int = 1,
+        cabin_class: str = 'ECONOMY',
+        non_stop: bool = False,
+        max_results: int = 50,
+        on_event: Optional[Callable[[SearchEvent], None]] = None,
+        providers: Optional[Sequence[str]] = None
+    ) -> Iterator[SearchUpdate]:
+        """Search all providers, yielding the best-so-far results as each lands.
         
-        st.markdown("---")
-        st.markdown("### 🔍 Căutare Zboruri")
+        An update follows every flight provider that returns results, so
+        the first table can be shown long before the slowest provider
+        answers; the final update (``done``) carries the ``SearchResult``.
+        ``providers`` limits the search to the named providers.
+        """
+        events: List[SearchEvent] = []
         
-        all_flights = []
+        def emit(kind: str, **data):
+            event = SearchEvent(kind, data)
+            events.append(event)
+            if on_event:
+                on_event(event)
         
-        # Show info about search
-        st.info(f"""
-        **Căutare pentru:**
-        - Rută: {origin.upper()} → {destination.upper()}
-        - Dată plecare: {departure_date}
-        - Dată întoarcere: {return_date if return_date else 'Nu'}
-        - Pasageri: {adults}
-        - Clasă: {cabin_class}
-        - Doar directe: {'Da' if non_stop else 'Nu'}
-        """)
+        emit('search_started', origin=origin.upper(), destination=destination.upper(),
+             departure_date=departure_date, return_date=return_date, adults=adults,
+             cabin_class=cabin_class, non_stop=non_stop)
         
-        # Try to get data from AirLabs (just for route verification)
-        try:
-            with st.spinner('🔍 Verificare rute disponibile...'):
-                routes = self.airlabs.search_routes(origin, destination)
-                if routes:
-                    st.success(f"✅ Rută validă: Găsite {len(routes)} conexiuni aeriene")
-                else:
-                    st.info("ℹ️ Verificare rute completată")
-        except Exception as e:
-            st.info("ℹ️ Verificare rute...")
+        # Flight providers feed the ranking as they land, not after the search
+        ranking = LiveRanking(max_results)
+        segment = 'direct' if non_stop else 'all'
         
-        # Load mock data
-        st.info("📦 Încărcare date de zbor...")
+        def current_stats() -> Dict[str, int]:
+            return {
+                'total': ranking.counts['all'],
+                'direct': ranking.counts['direct'],
+                'with_stops': ranking.counts['with_stops']
+            }
         
-        try:
-            from data.mock_flights import get_mock_flights
-            
-            mock_flights = get_mock_flights(
-                origin=origin,
-                destination=destination,
-                departure_date=departure_date,
-                return_date=return_date,
-                adults=adults,
-                non_stop=non_stop,
-                cabin_class=cabin_class
+        # Query every provider in parallel; each one has its own deadline and
+        # whatever has arrived when the overall budget runs out is merged
+        tasks = [
+            ProviderTask(
+                'airlabs',
+                partial(self.airlabs.async_search_routes, origin, destination),
+                AppConfig.PROVIDER_TIMEOUTS['airlabs']
+            ),
+            ProviderTask(
+                'skyscanner',
+                partial(
+                    self.skyscanner.async_search_flights,
+                    origin, destination, departure_date, return_date,
+                    adults, cabin_class, non_stop
+                ),
+                AppConfig.PROVIDER_TIMEOUTS['skyscanner']
+            ),
+            ProviderTask(
+                'aviationstack',
+                partial(self.aviationstack.async_search_flights,
+                        origin, destination),
+                AppConfig.PROVIDER_TIMEOUTS['aviationstack']
+            ),
+            ProviderTask(
+                'mock',
+                lambda: self._load_mock_flights(
+                    origin, destination, departure_date, return_date,
+                    adults, cabin_class, non_stop
+                ),
+                AppConfig.PROVIDER_TIMEOUTS['mock']
             )
+        ]
+        if providers is not None:
+            tasks = [task for task in tasks if task.name in providers]
+        
+        # Provider calls run in this context, sharing one retry budget
+        with retry_budget(AppConfig.SEARCH_RETRY_BUDGET):
+            context = contextvars.copy_context()
+        
+        outcomes: Dict[str, ProviderOutcome] = {}
+        for outcome in search_engine.stream(tasks, budget=AppConfig.SEARCH_BUDGET,
+                                            context=context):
+            outcomes[outcome.name] = outcome
+            count = len(outcome.result) if outcome.ok and outcome.result else 0
+            emit('provider_finished', provider=outcome.name, status=outcome.status,
+                 count=count, elapsed=outcome.elapsed,
+                 error=str(outcome.error) if outcome.error else None)
             
-            if mock_flights:
-                all_flights.extend(mock_flights)
-                self.use_mock = True
-                
-                st.success(f"""
-                ✅ **Găsite {len(mock_flights)} zboruri!**
-                
-                **Note:**
-                - Zborurile afișate sunt **date demonstrative**
-                - Prețurile sunt **estimate** bazate pe ruta selectată
-                - Pentru rezervări reale, vizitați site-urile companiilor aeriene
-                
-                **Caracteristici:**
-                - Filtrare funcțională (directe/escale)
-                - Sortare după preț
-                - Export date (CSV)
-                - Analiză statistică
-                """)
-            else:
-                st.warning("Nu s-au putut genera date de zbor")
-                
-        except ImportError:
-            st.error("❌ Modulul de date nu este disponibil")
-        except Exception as e:
-            st.error(f"❌ Eroare: {str(e)}")
+            # AirLabs is used just for route verification
+            if outcome.name != 'airlabs' and count:
+                ranking.extend(outcome.result)
+                yield SearchUpdate(
+                    outcome.name,
+                    FlightResultSet.from_flights(ranking.best(max_results, segment)),
+                    current_stats()
+                )
+        
+        routes_outcome = outcomes.get('airlabs')
+        if routes_outcome is not None:
+            emit('routes_verified', status=routes_outcome.status,
+                 count=len(routes_outcome.result or []) if routes_outcome.ok else 0)
         
-        st.markdown("---")
+        # Mock data
+        mock_outcome = outcomes.get('mock')
+        if mock_outcome is not None:
+            if mock_outcome.ok:
+                mock_flights = mock_outcome.result or []
+                if mock_flights:
+                    self.use_mock = True
+                emit('mock_data_loaded', count=len(mock_flights))
+            elif isinstance(mock_outcome.error, ImportError):
+                emit('mock_data_unavailable', reason='missing')
+            else:
+                emit('mock_data_unavailable', reason=mock_outcome.status,
+                     error=str(mock_outcome.error) if mock_outcome.error else None)
         
         # Summary statistics
-        if all_flights:
-            direct_count = len([f for f in all_flights if f.get('stops', 0) == 0])
-            with_stops_count = len([f for f in all_flights if f.get('stops', 0) > 0])
-            
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.metric("Total Zboruri", len(all_flights))
-            
-            with col2:
-                st.metric("✈️ Zboruri Directe", direct_count)
-            
-            with col3:
-                st.metric("🔄 Cu Escale", with_stops_count)
+        stats = current_stats()
+        emit('flights_collected', **stats)
         
-        # Sort by price
-        all_flights.sort(key=lambda x: x.get('price', float('inf')))
+        # Cheapest first; the non-stop filter reads the direct segment
+        if non_stop and stats['total'] and stats['direct'] < stats['total']:
+            emit('filter_applied', kept=stats['direct'], total=stats['total'])
         
-        # Apply non-stop filter if needed
-        if non_stop and all_flights:
-            before_filter = len(all_flights)
-            all_flights = [f for f in all_flights if f.get('stops', 0) == 0]
-            if len(all_flights) < before_filter:
-                st.info(f"🔍 Filtru aplicat: {len(all_flights)} zboruri directe din {before_filter} total")
+        flights = FlightResultSet.from_flights(ranking.best(max_results, segment))
+        emit('search_finished', count=len(flights))
+        
+        yield SearchUpdate(None, flights, stats, done=True,
+                           result=SearchResult(flights, events, outcomes, stats))
+    
+    @staticmethod
+    def _load_mock_flights(
+        origin: str,
+        destination: str,
+        departure_date: str,
+        return_date: Optional[str],
+        adults: int,
+        cabin_class: str,
+        non_stop: bool
+    ) -> List[Dict[str, Any]]:
+        """Load demonstration flight data"""
+        from data.mock_flights import get_mock_flights
         
-        return all_flights[:max_results]
+        return get_mock_flights(
+            origin=origin,
+            destination=destination,
+            departure_date=departure_date,
+            return_date=return_date,
+            adults=adults,
+            non_stop=non_stop,
+            cabin_class=cabin_class
+        )
@@ -0,0 +1,115 @@
+"""Shared asyncio HTTP client with persistent per-host connection pools."""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Dict, Optional
+
+import aiohttp
+
+from config.settings import AppConfig
+
+
+class HttpResponse:
+    """Status, headers and decoded JSON body of a finished request"""
+    
+    def __init__(self, status: int, headers: Dict[str, str], data: Any):
+        self.status = status
+        self.headers = headers
+        self.data = data
+
+
+class HttpClient:
+    """Owns one event loop thread and one pooled aiohttp session.
+    
+    Connections are kept alive and reused per host, so any number of
+    searches can be in flight without a thread or a TLS handshake each.
+    Synchronous callers use ``run``/``submit``; async code awaits
+    ``get_json`` directly on the client's loop.
+    """
+    
+    def __init__(self, limit: int = 200, limit_per_host: int = 32,
+                 keepalive_timeout: float = 60):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop running in the background thread, started on first use"""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever,
+                                          name='http-client', daemon=True)
+                thread.start()
+                self._loop = loop
+            return self._loop
+    
+    def submit(self, coro: Coroutine,
+               context: Optional[contextvars.Context] = None) -> Future:
+        """Schedule a coroutine on the client loop from any thread.
+        
+        The coroutine sees the context variables of ``context`` (default:
+        the caller's), such as the retry budget of the search it serves,
+        instead of the loop thread's.
+        """
+        if context is None:
+            context = contextvars.copy_context()
+        return asyncio.run_coroutine_threadsafe(self._in_context(coro, context), self.loop)
+    
+    @staticmethod
+    async def _in_context(coro: Coroutine, context: contextvars.Context) -> Any:
+        # Runs as its own task, so the values set here stay local to it
+        for var, value in context.items():
+            var.set(value)
+        return await coro
+    
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the client loop and block for its result"""
+        return self.submit(coro).result(timeout)
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # Only ever called on the client loop, so no locking is needed
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+    
+    async def get_json(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 10
+    ) -> HttpResponse:
+        """GET a URL over the shared pool and decode the JSON body"""
+        session = await self._get_session()
+        async with session.get(url, params=params, headers=headers,
+                               timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            try:
+                data = await response.json(content_type=None)
+            except ValueError:
+                data = None
+            return HttpResponse(response.status, dict(response.headers), data)
+    
+    async def _close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+    
+    def close(self):
+        """Close pooled connections"""
+        if self._loop is not None:
+            self.run(self._close())
+
+
+# Global HTTP client instance
+http_client = HttpClient(**AppConfig.HTTP_POOL)
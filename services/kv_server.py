@@ -0,0 +1,165 @@
+"""Local stand-in for a Redis server, for development and tests.
+
+Implements just the commands RemoteBackend uses. Run it with
+``python -m services.kv_server --port 6380`` and point
+``FLIGHT_CACHE_URL`` at ``redis://127.0.0.1:6380/0``.
+"""
+import argparse
+import fnmatch
+import socketserver
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.resp import RespError, encode_reply, read_reply
+
+
+class KeyValueStore:
+    """Thread-safe dict of bytes with optional per-key expiry"""
+    
+    def __init__(self):
+        self._data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+    
+    def _live(self, key: bytes) -> Optional[Tuple[bytes, Optional[float]]]:
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+    
+    def execute(self, args: List[bytes]) -> Any:
+        """Run one command and return its reply value"""
+        if not args:
+            return RespError('ERR empty command')
+        name = args[0].upper()
+        handler = getattr(self, '_cmd_' + name.decode('ascii', 'replace').lower(), None)
+        if handler is None:
+            return RespError(f"ERR unknown command '{name.decode('ascii', 'replace')}'")
+        with self._lock:
+            try:
+                return handler(*args[1:])
+            except (TypeError, ValueError):
+                return RespError(f"ERR wrong arguments for '{name.decode('ascii', 'replace')}'")
+    
+    def _cmd_ping(self, *args):
+        return 'PONG'
+    
+    def _cmd_select(self, db):
+        return 'OK'
+    
+    def _cmd_get(self, key):
+        entry = self._live(key)
+        return entry[0] if entry else None
+    
+    def _cmd_set(self, key, value, *options):
+        expires_at = None
+        options = [option.upper() for option in options]
+        if b'PX' in options:
+            expires_at = time.monotonic() + int(options[options.index(b'PX') + 1]) / 1000
+        elif b'EX' in options:
+            expires_at = time.monotonic() + int(options[options.index(b'EX') + 1])
+        self._data[key] = (value, expires_at)
+        return 'OK'
+    
+    def _cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._live(key) is not None:
+                del self._data[key]
+                removed += 1
+        return removed
+    
+    def _cmd_incr(self, key):
+        entry = self._live(key)
+        count = int(entry[0]) + 1 if entry else 1
+        self._data[key] = (str(count).encode(), entry[1] if entry else None)
+        return count
+    
+    def _cmd_pexpire(self, key, milliseconds):
+        entry = self._live(key)
+        if entry is None:
+            return 0
+        self._data[key] = (entry[0], time.monotonic() + int(milliseconds) / 1000)
+        return 1
+    
+    def _cmd_scan(self, cursor, *options):
+        pattern = b'*'
+        upper = [option.upper() for option in options]
+        if b'MATCH' in upper:
+            pattern = options[upper.index(b'MATCH') + 1]
+        keys = [key for key in list(self._data) if self._live(key) is not None
+                and fnmatch.fnmatchcase(key.decode('utf-8', 'replace'),
+                                        pattern.decode('utf-8', 'replace'))]
+        return [b'0', keys]
+    
+    def _cmd_flushdb(self, *args):
+        self._data.clear()
+        return 'OK'
+
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class KeyValueServer:
+    """Threaded TCP server speaking the Redis protocol over a KeyValueStore"""
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        store = KeyValueStore()
+        self.store = store
+        
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    try:
+                        command = read_reply(self.rfile)
+                    except (ConnectionError, ValueError):
+                        return
+                    if not isinstance(command, list):
+                        reply = RespError('ERR expected a command array')
+                    else:
+                        reply = store.execute(command)
+                    self.wfile.write(encode_reply(reply))
+        
+        self._server = _ThreadingServer((host, port), Handler)
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Host and port the server is bound to"""
+        return self._server.server_address[:2]
+    
+    @property
+    def url(self) -> str:
+        """URL to pass to ``RemoteBackend.from_url``"""
+        host, port = self.address
+        return f"redis://{host}:{port}/0"
+    
+    def start(self) -> 'KeyValueServer':
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='kv-server', daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop serving and release the port"""
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def serve_forever(self):
+        """Serve in the current thread"""
+        self._server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6380)
+    args = parser.parse_args()
+    
+    server = KeyValueServer(args.host, args.port)
+    print(f"Serving on {server.url}")
+    server.serve_forever()
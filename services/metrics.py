@@ -0,0 +1,308 @@
+"""In-process metrics: labelled counters and latency histograms.
+
+Providers, the cache and the rate limiter record into the global
+``metrics`` registry; ``render`` exports everything in the Prometheus
+text exposition format and the diagnostics panel reads ``snapshot``.
+"""
+import bisect
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds (in seconds) of the default latency buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str],
+                   extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonic count per combination of label values"""
+    
+    kind = 'counter'
+    
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, *label_values: str, amount: float = 1):
+        """Add ``amount`` to the series of ``label_values``"""
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+    
+    def value(self, *label_values: str) -> float:
+        """Current count of one series"""
+        return self._values.get(label_values, 0)
+    
+    def series(self) -> Dict[LabelValues, float]:
+        """Copy of every series"""
+        with self._lock:
+            return dict(self._values)
+    
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, values)} {_format_number(count)}"
+                for values, count in sorted(self.series().items())]
+    
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class _HistogramSeries:
+    __slots__ = ('counts', 'sum', 'count')
+    
+    def __init__(self, buckets: int):
+        self.counts = [0] * (buckets + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    """Observations counted into fixed buckets per combination of label values"""
+    
+    kind = 'histogram'
+    
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, _HistogramSeries] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, *label_values: str):
+        """Record one observation in the series of ``label_values``"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = _HistogramSeries(len(self.buckets))
+            series.counts[index] += 1
+            series.sum += value
+            series.count += 1
+    
+    def count(self, *label_values: str) -> int:
+        """Number of observations of one series"""
+        series = self._series.get(label_values)
+        return series.count if series else 0
+    
+    def quantile(self, q: float, *label_values: str) -> Optional[float]:
+        """Estimate a quantile by interpolating within its bucket (None if empty)"""
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None or not series.count:
+                return None
+            counts = list(series.counts)
+            total = series.count
+        
+        rank = q * total
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and seen + bucket_count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]  # beyond the largest bound
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+    
+    def summary(self, *label_values: str) -> Dict[str, Optional[float]]:
+        """Count, mean, p50, p95 and p99 of one series"""
+        series = self._series.get(label_values)
+        count = series.count if series else 0
+        return {
+            'count': count,
+            'mean': series.sum / count if count else None,
+            'p50': self.quantile(0.5, *label_values),
+            'p95': self.quantile(0.95, *label_values),
+            'p99': self.quantile(0.99, *label_values)
+        }
+    
+    def label_sets(self) -> List[LabelValues]:
+        """Label values of every series"""
+        with self._lock:
+            return sorted(self._series)
+    
+    def render(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = sorted((values, list(series.counts), series.sum, series.count)
+                           for values, series in self._series.items())
+        for values, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, values, ('le', _format_number(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+    
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+class MetricsRegistry:
+    """Named metrics, created on first use and shared by every caller"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+    
+    def _get_or_create(self, cls, name: str, help: str, labels: Sequence[str], **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = cls(name, help, labels, **kwargs)
+        if not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+        return metric
+    
+    def counter(self, name: str, help: str = '', labels: Sequence[str] = ()) -> Counter:
+        """Get or create a counter"""
+        return self._get_or_create(Counter, name, help, labels)
+    
+    def histogram(self, name: str, help: str = '', labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """Get or create a histogram"""
+        return self._get_or_create(Histogram, name, help, labels, buckets=buckets)
+    
+    def get(self, name: str):
+        """A registered metric, or None"""
+        return self._metrics.get(name)
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for name in sorted(self._metrics):
+            metric = self._metrics[name]
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+    
+    def reset(self):
+        """Zero every metric (the metrics stay registered)"""
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
+
+# Metrics recorded by the services
+PROVIDER_REQUESTS = metrics.counter(
+    'flight_provider_requests_total', 'Provider HTTP requests by outcome',
+    ('provider', 'outcome')
+)
+PROVIDER_LATENCY = metrics.histogram(
+    'flight_provider_request_seconds', 'Provider HTTP request latency', ('provider',)
+)
+HEDGED_REQUESTS = metrics.counter(
+    'flight_hedged_requests_total',
+    'Hedged requests: won or lost against the original, failed, or throttled',
+    ('provider', 'result')
+)
+CACHE_LOOKUPS = metrics.counter(
+    'flight_cache_lookups_total', 'Cache lookups by the tier that answered (or miss)',
+    ('cache', 'result')
+)
+RATE_LIMIT_CHECKS = metrics.counter(
+    'flight_rate_limit_checks_total', 'Non-blocking rate limit checks', ('api', 'result')
+)
+RATE_LIMIT_WAIT = metrics.histogram(
+    'flight_rate_limit_wait_seconds', 'Time spent waiting for a rate limit token', ('api',)
+)
+
+
+def _is_error(outcome: str) -> bool:
+    """Server errors (5xx), timeouts and connection failures; 4xx are answers"""
+    if outcome.isdigit():
+        return int(outcome) >= 500
+    return outcome in ('timeout', 'error')
+
+
+def snapshot() -> Dict[str, List[Dict[str, object]]]:
+    """Per-provider, per-cache and per-API summaries for the diagnostics panel"""
+    providers = []
+    requests_by_provider: Dict[str, Dict[str, float]] = {}
+    for (provider, outcome), count in PROVIDER_REQUESTS.series().items():
+        requests_by_provider.setdefault(provider, {})[outcome] = count
+    for provider, outcomes in sorted(requests_by_provider.items()):
+        cancelled = outcomes.get('cancelled', 0)
+        short_circuits = outcomes.get('short_circuit', 0)
+        # Requests that got an answer or failed; cancelled hedges and calls
+        # refused by an open circuit are reported on their own
+        total = sum(outcomes.values()) - cancelled - short_circuits
+        errors = sum(count for outcome, count in outcomes.items() if _is_error(outcome))
+        latency = PROVIDER_LATENCY.summary(provider)
+        hedges_won = HEDGED_REQUESTS.value(provider, 'won')
+        hedges = hedges_won + HEDGED_REQUESTS.value(provider, 'lost')
+        providers.append({
+            'provider': provider,
+            'requests': int(total),
+            'errors': int(errors),
+            'error_rate': errors / total if total else 0.0,
+            'cancelled': int(cancelled),
+            'short_circuits': int(short_circuits),
+            'p50': latency['p50'],
+            'p95': latency['p95'],
+            'hedges': int(hedges),
+            'hedge_win_rate': hedges_won / hedges if hedges else None
+        })
+    
+    caches = []
+    lookups_by_cache: Dict[str, Dict[str, float]] = {}
+    for (cache_name, result), count in CACHE_LOOKUPS.series().items():
+        lookups_by_cache.setdefault(cache_name, {})[result] = count
+    for cache_name, results in sorted(lookups_by_cache.items()):
+        total = sum(results.values())
+        hits = total - results.get('miss', 0)
+        caches.append({
+            'cache': cache_name,
+            'lookups': int(total),
+            'hits': int(hits),
+            'hit_rate': hits / total if total else 0.0,
+            'tiers': {tier: int(count) for tier, count in results.items() if tier != 'miss'}
+        })
+    
+    rate_limits = []
+    checks = RATE_LIMIT_CHECKS.series()
+    apis = {api for api, _ in checks} | {api for api, in RATE_LIMIT_WAIT.label_sets()}
+    for api in sorted(apis):
+        wait = RATE_LIMIT_WAIT.summary(api)
+        rate_limits.append({
+            'api': api,
+            'waits': wait['count'],
+            'mean_wait': wait['mean'],
+            'p95_wait': wait['p95'],
+            'throttled': int(checks.get((api, 'throttled'), 0))
+        })
+    
+    return {'providers': providers, 'caches': caches, 'rate_limits': rate_limits}
@@ -0,0 +1,332 @@
+"""Append-only price history of monitored routes, stored as columnar segments."""
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within the process
+    fcntl = None
+
+from config.settings import AppConfig
+from utils.result_set import FlightResultSet
+
+# Per-observation columns: file name -> dtype
+_COLUMNS = {
+    'ts': np.float64,
+    'min': np.float32,
+    'median': np.float32,
+    'count': np.int32
+}
+
+# One row per (observation, airline): cheapest price of the airline
+_AIRLINE_COLUMNS = {
+    'airline_obs': np.uint32,
+    'airline_id': np.uint16,
+    'airline_price': np.float32
+}
+
+
+def summarize(flights: Any) -> Optional[Dict[str, Any]]:
+    """Min, median and per-airline minimum of the known prices in a result"""
+    result_set = FlightResultSet.from_flights(flights if flights is not None else [])
+    price = result_set.columns['price']
+    valid = ~np.isnan(price) & (price > 0)
+    if not valid.any():
+        return None
+    
+    per_airline: Dict[str, float] = {}
+    for flight, flight_price in zip(result_set[valid], price[valid]):
+        airline = flight.get('airline') or 'N/A'
+        if flight_price < per_airline.get(airline, np.inf):
+            per_airline[airline] = float(flight_price)
+    
+    return {
+        'min': float(price[valid].min()),
+        'median': float(np.median(price[valid])),
+        'count': int(valid.sum()),
+        'airlines': per_airline
+    }
+
+
+class PriceHistoryStore:
+    """Price observations per route, in monthly append-only column files.
+    
+    Every route owns a directory with one segment per calendar month
+    (UTC); a segment holds one raw binary file per column, so recording
+    an observation appends a few bytes to each file and a range query
+    reads only the segments it overlaps, then bisects the timestamps
+    (appended in time order). Airline names are dictionary-encoded per
+    route.
+    
+    Directories are created on the first write, so a read-only filesystem
+    only loses the history. Writers take an exclusive ``flock`` on the
+    route's lock file, so replicas sharing the directory do not interleave
+    their appends.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # route key -> (size of airlines.txt when read, name -> id)
+        self._airlines: Dict[str, Tuple[int, Dict[str, int]]] = {}
+    
+    # ---- layout ----
+    
+    @staticmethod
+    def route_id(route_key: str) -> str:
+        """Directory name for a route"""
+        return hashlib.sha1(route_key.encode('utf-8')).hexdigest()[:16]
+    
+    def _route_dir(self, route_key: str) -> str:
+        return os.path.join(self.path, self.route_id(route_key))
+    
+    @staticmethod
+    def _segment_name(ts: float) -> str:
+        return time.strftime('%Y%m', time.gmtime(ts))
+    
+    def _segments(self, route_key: str) -> List[str]:
+        route_dir = self._route_dir(route_key)
+        if not os.path.isdir(route_dir):
+            return []
+        return sorted(
+            os.path.join(route_dir, name) for name in os.listdir(route_dir)
+            if name.isdigit()
+        )
+    
+    def _airline_ids(self, route_key: str) -> Dict[str, int]:
+        # Called with the lock held; re-read when another process added names
+        names_path = os.path.join(self._route_dir(route_key), 'airlines.txt')
+        size = os.path.getsize(names_path) if os.path.exists(names_path) else 0
+        cached = self._airlines.get(route_key)
+        if cached is not None and cached[0] == size:
+            return cached[1]
+        
+        ids: Dict[str, int] = {}
+        if size:
+            with open(names_path, encoding='utf-8') as f:
+                for line in f:
+                    ids.setdefault(line.rstrip('\n'), len(ids))
+        self._airlines[route_key] = (size, ids)
+        return ids
+    
+    def _airline_names(self, route_key: str) -> List[str]:
+        with self._lock:
+            ids = self._airline_ids(route_key)
+            return sorted(ids, key=ids.get)
+    
+    # ---- writes ----
+    
+    def record(self, route_key: str, flights: Any, ts: Optional[float] = None) -> bool:
+        """Append one observation of a search result; False if it had no prices"""
+        summary = summarize(flights)
+        if summary is None:
+            return False
+        ts = time.time() if ts is None else ts
+        
+        route_dir = self._route_dir(route_key)
+        segment = os.path.join(route_dir, self._segment_name(ts))
+        os.makedirs(segment, exist_ok=True)
+        with self._lock, self._file_lock(route_dir):
+            if not os.path.exists(os.path.join(route_dir, 'route.txt')):
+                with open(os.path.join(route_dir, 'route.txt'), 'w', encoding='utf-8') as f:
+                    f.write(route_key)
+            
+            ids = self._airline_ids(route_key)
+            new_names = [name for name in summary['airlines'] if name not in ids]
+            if new_names:
+                names_path = os.path.join(route_dir, 'airlines.txt')
+                with open(names_path, 'a', encoding='utf-8') as f:
+                    for name in new_names:
+                        ids[name] = len(ids)
+                        f.write(name.replace('\n', ' ') + '\n')
+                self._airlines[route_key] = (os.path.getsize(names_path), ids)
+            
+            obs = self._length(segment)
+            self._repair(segment, obs)
+            self._append(segment, 'ts', [ts])
+            self._append(segment, 'min', [summary['min']])
+            self._append(segment, 'median', [summary['median']])
+            self._append(segment, 'count', [summary['count']])
+            airlines = summary['airlines']
+            self._append(segment, 'airline_obs', [obs] * len(airlines))
+            self._append(segment, 'airline_id', [ids[name] for name in airlines])
+            self._append(segment, 'airline_price', list(airlines.values()))
+        return True
+    
+    @staticmethod
+    @contextmanager
+    def _file_lock(route_dir: str) -> Iterator[None]:
+        """Exclusive lock on a route across processes"""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(route_dir, '.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    
+    @staticmethod
+    def _append(segment: str, column: str, values: List[Any]):
+        dtype = _COLUMNS.get(column) or _AIRLINE_COLUMNS[column]
+        with open(os.path.join(segment, column), 'ab') as f:
+            f.write(np.asarray(values, dtype=dtype).tobytes())
+    
+    @staticmethod
+    def _read(segment: str, column: str) -> np.ndarray:
+        dtype = np.dtype(_COLUMNS.get(column) or _AIRLINE_COLUMNS[column])
+        path = os.path.join(segment, column)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=dtype)
+        data = np.fromfile(path, dtype=np.uint8)
+        # Ignore a partially written trailing value
+        usable = len(data) - len(data) % dtype.itemsize
+        return data[:usable].view(dtype)
+    
+    @staticmethod
+    def _length(segment: str) -> int:
+        # Observations complete in every column (a crash may leave one short)
+        lengths = []
+        for column, dtype in _COLUMNS.items():
+            path = os.path.join(segment, column)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            lengths.append(size // np.dtype(dtype).itemsize)
+        return min(lengths)
+    
+    @staticmethod
+    def _repair(segment: str, length: int):
+        """Drop the tail of an observation that was only partly written"""
+        for column, dtype in _COLUMNS.items():
+            path = os.path.join(segment, column)
+            size = length * np.dtype(dtype).itemsize
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+        
+        # Airline rows of the dropped observation, or a torn row
+        rows = {
+            column: (os.path.getsize(os.path.join(segment, column))
+                     if os.path.exists(os.path.join(segment, column)) else 0)
+            / np.dtype(dtype).itemsize
+            for column, dtype in _AIRLINE_COLUMNS.items()
+        }
+        count = int(min(rows.values()))
+        aligned = all(value == count for value in rows.values())
+        if aligned and count:
+            last_obs = np.fromfile(os.path.join(segment, 'airline_obs'), dtype=np.uint32,
+                                   count=1, offset=(count - 1) * 4)
+            if last_obs[0] < length:
+                return
+        elif aligned:
+            return
+        
+        obs = PriceHistoryStore._read(segment, 'airline_obs')[:count]
+        keep = int(np.searchsorted(obs, length, 'left'))
+        for column, dtype in _AIRLINE_COLUMNS.items():
+            path = os.path.join(segment, column)
+            if os.path.exists(path):
+                os.truncate(path, keep * np.dtype(dtype).itemsize)
+    
+    # ---- queries ----
+    
+    def routes(self) -> List[str]:
+        """Keys of all routes with history"""
+        if not os.path.isdir(self.path):
+            return []
+        keys = []
+        for name in sorted(os.listdir(self.path)):
+            route_file = os.path.join(self.path, name, 'route.txt')
+            if os.path.exists(route_file):
+                with open(route_file, encoding='utf-8') as f:
+                    keys.append(f.read())
+        return keys
+    
+    def query(self, route_key: str, start: Optional[float] = None,
+              end: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Observations with ``start <= ts < end`` as columns ts/min/median/count"""
+        parts = self._query_segments(route_key, start, end)
+        return {
+            column: (np.concatenate([part[column] for part, _ in parts]) if parts
+                     else np.empty(0, dtype=dtype))
+            for column, dtype in _COLUMNS.items()
+        }
+    
+    def query_airlines(self, route_key: str, start: Optional[float] = None,
+                       end: Optional[float] = None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """Cheapest price per airline over time: airline -> (ts, price)"""
+        names = self._airline_names(route_key)
+        ts_parts, id_parts, price_parts = [], [], []
+        for columns, (segment, lo, hi) in self._query_segments(route_key, start, end):
+            obs = self._read(segment, 'airline_obs')
+            airline_id = self._read(segment, 'airline_id')
+            price = self._read(segment, 'airline_price')
+            n = min(len(obs), len(airline_id), len(price))
+            obs, airline_id, price = obs[:n], airline_id[:n], price[:n]
+            mask = (obs >= lo) & (obs < hi)
+            ts_parts.append(columns['ts'][obs[mask] - lo])
+            id_parts.append(airline_id[mask])
+            price_parts.append(price[mask])
+        
+        if not ts_parts:
+            return {}
+        ts, airline_id, price = (np.concatenate(ts_parts), np.concatenate(id_parts),
+                                 np.concatenate(price_parts))
+        return {
+            names[index]: (ts[airline_id == index], price[airline_id == index])
+            for index in np.unique(airline_id) if index < len(names)
+        }
+    
+    def _query_segments(self, route_key: str, start: Optional[float],
+                        end: Optional[float]) -> List[Tuple[Dict[str, np.ndarray],
+                                                            Tuple[str, int, int]]]:
+        first = self._segment_name(start) if start is not None else None
+        last = self._segment_name(end) if end is not None else None
+        parts = []
+        for segment in self._segments(route_key):
+            name = os.path.basename(segment)
+            if (first and name < first) or (last and name > last):
+                continue
+            n = self._length(segment)
+            ts = self._read(segment, 'ts')[:n]
+            lo = int(np.searchsorted(ts, start, 'left')) if start is not None else 0
+            hi = int(np.searchsorted(ts, end, 'left')) if end is not None else n
+            if hi <= lo:
+                continue
+            columns = {column: self._read(segment, column)[lo:hi] for column in _COLUMNS}
+            parts.append((columns, (segment, lo, hi)))
+        return parts
+    
+    def downsample(self, route_key: str, start: Optional[float] = None,
+                   end: Optional[float] = None,
+                   max_points: int = 200) -> Dict[str, np.ndarray]:
+        """Range query reduced to at most ``max_points`` equal-width time buckets.
+        
+        Each bucket keeps its start time, the lowest minimum and the
+        median of the observed medians.
+        """
+        data = self.query(route_key, start, end)
+        ts = data['ts']
+        if len(ts) <= max_points:
+            return {'ts': ts, 'min': data['min'], 'median': data['median']}
+        
+        edges = np.linspace(ts[0], ts[-1], max_points + 1)
+        bucket = np.clip(np.searchsorted(edges, ts, 'right') - 1, 0, max_points - 1)
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        bounds = np.r_[starts, len(ts)]
+        return {
+            'ts': edges[bucket[starts]],
+            'min': np.minimum.reduceat(data['min'], starts),
+            'median': np.array([np.median(data['median'][lo:hi])
+                                for lo, hi in zip(bounds[:-1], bounds[1:])],
+                               dtype=np.float32)
+        }
+
+
+# Global price history store
+price_history = PriceHistoryStore(AppConfig.PRICE_HISTORY['path'])
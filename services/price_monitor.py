@@ -0,0 +1,226 @@
+"""Background price monitoring shared by all sessions."""
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.settings import AppConfig
+from services.price_history import PriceHistoryStore, price_history
+
+
+class MonitoredRoute:
+    """A route refreshed on a timer, with the sessions watching it"""
+    
+    def __init__(self, key: str, params: Dict[str, Any], interval: float,
+                 label: str = ''):
+        self.key = key
+        self.params = params
+        self.interval = interval
+        self.label = label
+        self.flights: Any = None
+        self.error: Optional[BaseException] = None
+        self.version = 0
+        self.last_checked: Optional[float] = None
+        self.anchor = time.monotonic()  # start of the current interval
+        self.next_run = 0.0
+        self.running = False
+        # session id -> (interval, last seen version)
+        self.subscribers: Dict[str, Tuple[float, int]] = {}
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary for display"""
+        return {
+            'key': self.key,
+            'route': self.label,
+            'interval': self.interval,
+            'version': self.version,
+            'last_checked': self.last_checked,
+            'next_run_in': max(0.0, self.next_run - time.monotonic()),
+            'count': len(self.flights) if self.flights is not None else 0,
+            'error': str(self.error) if self.error else None
+        }
+
+
+class PriceMonitor:
+    """Refreshes monitored routes on a priority queue of due times.
+    
+    One timer thread sleeps until the earliest route is due and hands the
+    refresh to a small worker pool, so monitoring costs no thread per
+    session. Sessions register routes with ``watch``, and pick up new
+    results with ``poll``. Each route is refreshed once however many
+    sessions watch it, at the shortest interval any of them asked for.
+    Sessions that stop polling for ``session_ttl`` seconds are dropped.
+    Every result is also appended to ``history`` when one is given.
+    """
+    
+    def __init__(self, search_fn: Optional[Callable[..., Any]] = None,
+                 max_workers: int = 4, session_ttl: float = 180,
+                 history: Optional[PriceHistoryStore] = None):
+        self.search_fn = search_fn or self._default_search
+        self.history = history
+        self.session_ttl = session_ttl
+        self._routes: Dict[str, MonitoredRoute] = {}
+        self._sessions: Dict[str, float] = {}  # session id -> last seen
+        self._queue: List[Tuple[float, int, str]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='price-monitor')
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+    
+    @staticmethod
+    def _default_search(**params) -> Any:
+        from services.flight_apis import FlightAggregator
+        
+        return FlightAggregator().search(**params).flights
+    
+    # ---- session API ----
+    
+    def watch(self, session_id: str, key: str, params: Dict[str, Any],
+              interval: float, label: str = '') -> MonitoredRoute:
+        """Monitor a route for a session; the first refresh runs after ``interval``.
+        
+        Watching a route again only updates the interval: results the
+        session has not polled yet are still reported.
+        """
+        now = time.monotonic()
+        with self._condition:
+            self._sessions[session_id] = now
+            route = self._routes.get(key)
+            if route is None:
+                route = MonitoredRoute(key, params, interval, label)
+                self._routes[key] = route
+            _, seen = route.subscribers.get(session_id, (interval, route.version))
+            route.subscribers[session_id] = (interval, seen)
+            self._reschedule(route, now)
+            self._ensure_started()
+            return route
+    
+    def record_result(self, key: str, flights: Any):
+        """Store a result the session already has, so watchers start from it"""
+        with self._condition:
+            route = self._routes.get(key)
+            if route is None:
+                return
+            route.flights = flights
+            route.last_checked = time.time()
+        self._record_history(key, flights)
+    
+    def unwatch(self, session_id: str, key: Optional[str] = None):
+        """Stop monitoring one route, or all routes, for a session"""
+        with self._condition:
+            keys = [key] if key else list(self._routes)
+            for route_key in keys:
+                route = self._routes.get(route_key)
+                if route is not None and route.subscribers.pop(session_id, None):
+                    self._reschedule(route, time.monotonic())
+    
+    def routes(self, session_id: str) -> List[Dict[str, Any]]:
+        """Routes a session is monitoring"""
+        with self._condition:
+            return [route.to_dict() for route in self._routes.values()
+                    if session_id in route.subscribers]
+    
+    def poll(self, session_id: str) -> List[MonitoredRoute]:
+        """Routes refreshed since this session last polled; also renews its lease"""
+        updated = []
+        with self._condition:
+            self._sessions[session_id] = time.monotonic()
+            for route in self._routes.values():
+                subscription = route.subscribers.get(session_id)
+                if subscription and route.version > subscription[1]:
+                    route.subscribers[session_id] = (subscription[0], route.version)
+                    updated.append(route)
+        return updated
+    
+    # ---- scheduling ----
+    
+    def _reschedule(self, route: MonitoredRoute, now: float):
+        # Called with the condition held
+        if not route.subscribers:
+            self._routes.pop(route.key, None)
+            return
+        route.interval = min(interval for interval, _ in route.subscribers.values())
+        if route.running:
+            return  # rescheduled when the refresh completes
+        next_run = max(now, route.anchor + route.interval)
+        if next_run != route.next_run:
+            route.next_run = next_run
+            heapq.heappush(self._queue, (next_run, next(self._sequence), route.key))
+            self._condition.notify()
+    
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._loop, name='price-monitor',
+                                            daemon=True)
+            self._thread.start()
+    
+    def _loop(self):
+        with self._condition:
+            while not self._stopped:
+                self._expire_sessions()
+                if not self._queue:
+                    self._condition.wait(timeout=self.session_ttl)
+                    continue
+                due, _, key = self._queue[0]
+                now = time.monotonic()
+                if due > now:
+                    self._condition.wait(timeout=min(due - now, self.session_ttl))
+                    continue
+                heapq.heappop(self._queue)
+                route = self._routes.get(key)
+                # Stale heap entries (rescheduled or removed routes) are skipped
+                if route is None or route.running or route.next_run != due:
+                    continue
+                route.running = True
+                self._executor.submit(self._refresh, route)
+    
+    def _refresh(self, route: MonitoredRoute):
+        try:
+            flights, error = self.search_fn(**route.params), None
+        except Exception as e:
+            flights, error = None, e
+        
+        if error is None:
+            self._record_history(route.key, flights)
+        
+        with self._condition:
+            route.running = False
+            route.last_checked = time.time()
+            route.error = error
+            if error is None:
+                route.flights = flights
+                route.version += 1
+            route.anchor = time.monotonic()
+            self._reschedule(route, time.monotonic())
+    
+    def _record_history(self, key: str, flights: Any):
+        if self.history is None:
+            return
+        try:
+            self.history.record(key, flights)
+        except OSError:
+            pass  # history is best effort; monitoring carries on without it
+    
+    def _expire_sessions(self):
+        cutoff = time.monotonic() - self.session_ttl
+        for session_id in [s for s, seen in self._sessions.items() if seen < cutoff]:
+            del self._sessions[session_id]
+            for route in list(self._routes.values()):
+                if route.subscribers.pop(session_id, None):
+                    self._reschedule(route, time.monotonic())
+    
+    def stop(self):
+        """Stop the timer thread and the workers"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._executor.shutdown(wait=False)
+
+
+# Global price monitor instance
+price_monitor = PriceMonitor(history=price_history, **AppConfig.PRICE_MONITOR)
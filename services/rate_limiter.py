@@ -0,0 +1,121 @@
+"""Token-bucket rate limiting with O(1) checks and exact wake-up times."""
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+from config.settings import AppConfig
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate`` tokens per second.
+    
+    ``reserve`` takes tokens immediately, letting the balance go negative,
+    and returns how long the caller must wait before using them. Waiters
+    are therefore served in arrival order and wake exactly when their
+    token becomes available instead of polling.
+    """
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens if they are available right now"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+    
+    def release(self, tokens: float = 1):
+        """Give back tokens taken for a request that was not sent"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + tokens)
+    
+    def reserve(self, tokens: float = 1, max_wait: Optional[float] = None) -> Optional[float]:
+        """Reserve tokens and return the delay before they may be used.
+        
+        Returns None, reserving nothing, if the delay would exceed ``max_wait``.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            delay = max(0.0, (tokens - self._tokens) / self.rate)
+            if max_wait is not None and delay > max_wait:
+                return None
+            self._tokens -= tokens
+            return delay
+    
+    def penalize(self, seconds: float):
+        """Empty the bucket so the next token is available in ``seconds`` at the earliest.
+        
+        Used when the API itself answers "too many requests": every waiter
+        then backs off, not just the caller that was refused.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 1 - seconds * self.rate)
+    
+    def time_until_available(self, tokens: float = 1) -> float:
+        """Seconds until ``tokens`` could be taken without waiting"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, (tokens - self._tokens) / self.rate)
+    
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """Block until tokens are available; False if ``timeout`` is too short"""
+        delay = self.reserve(tokens, timeout)
+        if delay is None:
+            return False
+        if delay:
+            time.sleep(delay)
+        return True
+    
+    async def acquire_async(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """Like ``acquire`` but yields to the event loop while waiting"""
+        delay = self.reserve(tokens, timeout)
+        if delay is None:
+            return False
+        if delay:
+            await asyncio.sleep(delay)
+        return True
+
+
+class RateLimiter:
+    """Token buckets per API, sized from ``AppConfig.RATE_LIMITS``"""
+    
+    def __init__(self):
+        self.buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+    
+    def bucket(self, api_name: str, max_requests: Optional[int] = None,
+               time_window: float = 60) -> TokenBucket:
+        """Get the bucket for an API, allowing ``max_requests`` per ``time_window``"""
+        if max_requests is None:
+            max_requests = AppConfig.RATE_LIMITS.get(api_name, 10)
+        rate = max_requests / time_window
+        
+        bucket = self.buckets.get(api_name)
+        if bucket is not None and bucket.rate == rate and bucket.capacity == max_requests:
+            return bucket
+        
+        with self._lock:
+            bucket = self.buckets.get(api_name)
+            if bucket is None or bucket.rate != rate or bucket.capacity != max_requests:
+                bucket = TokenBucket(rate=rate, capacity=max_requests)
+                self.buckets[api_name] = bucket
+            return bucket
+    
+    def reset(self):
+        """Forget all buckets"""
+        with self._lock:
+            self.buckets.clear()
@@ -0,0 +1,68 @@
+"""Minimal Redis serialization protocol (RESP2) encoding and decoding."""
+from typing import Any, BinaryIO, Iterable, Union
+
+
+class RespError(Exception):
+    """Error reply sent by the server"""
+
+
+def _to_bytes(value: Union[bytes, str, int, float]) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode('utf-8')
+
+
+def encode_command(args: Iterable[Union[bytes, str, int, float]]) -> bytes:
+    """Encode a command as an array of bulk strings"""
+    parts = [_to_bytes(arg) for arg in args]
+    chunks = [b'*%d\r\n' % len(parts)]
+    for part in parts:
+        chunks.append(b'$%d\r\n%s\r\n' % (len(part), part))
+    return b''.join(chunks)
+
+
+def encode_reply(value: Any) -> bytes:
+    """Encode a server reply; exceptions become error replies"""
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, RespError):
+        return b'-%s\r\n' % _to_bytes(str(value))
+    if isinstance(value, bool):
+        return b':%d\r\n' % int(value)
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, (list, tuple)):
+        return b'*%d\r\n' % len(value) + b''.join(encode_reply(item) for item in value)
+    if isinstance(value, str):
+        return b'+%s\r\n' % value.encode('utf-8')
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+def read_reply(reader: BinaryIO) -> Any:
+    """Read one RESP value from a buffered binary stream.
+    
+    Error replies are returned as ``RespError`` instances, not raised, so
+    the caller decides whether they are fatal.
+    """
+    line = reader.readline()
+    if not line:
+        raise ConnectionError('connection closed by peer')
+    prefix, rest = line[:1], line[1:-2]
+    
+    if prefix == b'+':
+        return rest.decode('utf-8')
+    if prefix == b'-':
+        return RespError(rest.decode('utf-8'))
+    if prefix == b':':
+        return int(rest)
+    if prefix == b'$':
+        length = int(rest)
+        if length < 0:
+            return None
+        return reader.read(length + 2)[:-2]
+    if prefix == b'*':
+        length = int(rest)
+        if length < 0:
+            return None
+        return [read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f'unexpected reply prefix {prefix!r}')
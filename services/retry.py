@@ -0,0 +1,165 @@
+"""Retries with jittered exponential backoff, Retry-After and per-search budgets."""
+import asyncio
+import contextvars
+import random
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Iterator, Optional, Sequence, Tuple, Type
+
+import aiohttp
+
+from config.settings import AppConfig
+from services.cache_manager import cache_manager
+from services.http_client import HttpResponse
+from services.metrics import metrics
+
+RETRIES = metrics.counter(
+    'flight_provider_retries_total',
+    'Provider retries, and retries given up (attempts, budget or Retry-After too long)',
+    ('provider', 'result')
+)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a ``Retry-After`` header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryBudget:
+    """Retries one search may spend across all of its provider calls"""
+    
+    def __init__(self, max_retries: int):
+        self.remaining = max_retries
+        self._lock = threading.Lock()
+    
+    def spend(self) -> bool:
+        """Take one retry; False once the budget is exhausted"""
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+# Budget of the search the current task belongs to (None: only max_attempts applies)
+current_budget: contextvars.ContextVar[Optional[RetryBudget]] = contextvars.ContextVar(
+    'retry_budget', default=None
+)
+
+
+@contextmanager
+def retry_budget(max_retries: int) -> Iterator[RetryBudget]:
+    """Give the provider calls started inside the block a shared retry budget"""
+    budget = RetryBudget(max_retries)
+    token = current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        current_budget.reset(token)
+
+
+class RetryPolicy:
+    """When to retry a provider call and how long to wait before it.
+    
+    Connection errors, timeouts and ``retry_statuses`` are retried up to
+    ``max_attempts`` calls in total. The wait is the server's
+    ``Retry-After`` when given, otherwise full-jitter exponential backoff
+    (uniform in ``0 .. min(max_delay, base_delay * 2**retry)``). A
+    ``Retry-After`` longer than ``max_retry_after`` is not waited for.
+    """
+    
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.25, max_delay: float = 4.0,
+                 max_retry_after: float = 10.0,
+                 retry_statuses: Sequence[int] = (429, 500, 502, 503, 504),
+                 retry_exceptions: Tuple[Type[BaseException], ...] = (
+                     asyncio.TimeoutError, aiohttp.ClientError
+                 )):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_exceptions = retry_exceptions
+    
+    def backoff(self, retry: int) -> float:
+        """Full-jitter delay before retry number ``retry`` (0-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+    
+    def delay(self, retry: int, response: Optional[HttpResponse]) -> Optional[float]:
+        """Wait before the next attempt; None if the server asks for too long"""
+        if response is not None:
+            retry_after = parse_retry_after(
+                next((v for k, v in response.headers.items() if k.lower() == 'retry-after'),
+                     None)
+            )
+            if retry_after is not None:
+                return retry_after if retry_after <= self.max_retry_after else None
+        return self.backoff(retry)
+    
+    async def call(self, api_name: str,
+                   request: Callable[[], Awaitable[HttpResponse]]) -> HttpResponse:
+        """Run ``request`` with retries, returning the last response or raising the last error.
+        
+        Waits go through the provider's rate limiter: a 429 drains its
+        bucket for the delay, so every other caller of that provider
+        backs off too, and rate-limited providers take a token before
+        each retry.
+        """
+        retry = 0
+        while True:
+            response: Optional[HttpResponse] = None
+            error: Optional[BaseException] = None
+            try:
+                response = await request()
+            except self.retry_exceptions as exc:
+                error = exc
+            else:
+                if response.status not in self.retry_statuses:
+                    return response
+            
+            def give_up(reason: str) -> HttpResponse:
+                RETRIES.inc(api_name, reason)
+                if error is not None:
+                    raise error
+                return response
+            
+            if retry + 1 >= self.max_attempts:
+                return give_up('attempts_exhausted')
+            delay = self.delay(retry, response)
+            if delay is None:
+                return give_up('retry_after_too_long')
+            budget = current_budget.get()
+            if budget is not None and not budget.spend():
+                return give_up('budget_exhausted')
+            
+            RETRIES.inc(api_name, 'retry')
+            throttled = response is not None and response.status == 429
+            if api_name in AppConfig.RATE_LIMITS:
+                limit = AppConfig.RATE_LIMITS[api_name]
+                if throttled:
+                    cache_manager.rate_limiter.bucket(api_name, limit).penalize(delay)
+                else:
+                    await asyncio.sleep(delay)
+                await cache_manager.async_wait_for_rate_limit(api_name, limit)
+            else:
+                await asyncio.sleep(delay)
+            retry += 1
+
+
+# Global retry policy for provider calls
+retry_policy = RetryPolicy(**AppConfig.RETRY_POLICY)
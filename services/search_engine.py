@@ -0,0 +1,159 @@
+"""Concurrent fan-out of provider calls for flight searches."""
+import contextvars
+import inspect
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from services.http_client import http_client
+
+
+class ProviderTask:
+    """A single provider call with its own deadline.
+    
+    ``func`` is either a plain callable, run on the worker pool, or a
+    coroutine function, run on the shared HTTP client loop.
+    """
+    
+    def __init__(self, name: str, func: Callable[[], Any], timeout: float):
+        self.name = name
+        self.func = func
+        self.timeout = timeout
+
+
+class ProviderOutcome:
+    """Outcome of a provider call: ok, error or timeout"""
+    
+    def __init__(self, name: str, status: str, result: Any = None,
+                 error: Optional[BaseException] = None, elapsed: float = 0.0):
+        self.name = name
+        self.status = status
+        self.result = result
+        self.error = error
+        self.elapsed = elapsed
+    
+    @property
+    def ok(self) -> bool:
+        return self.status == 'ok'
+
+
+class SearchEvent:
+    """Structured progress event emitted while a search runs"""
+    
+    def __init__(self, kind: str, data: Optional[Dict[str, Any]] = None):
+        self.kind = kind
+        self.data = data or {}
+    
+    def __repr__(self) -> str:
+        return f"SearchEvent({self.kind!r}, {self.data!r})"
+
+
+class SearchResult:
+    """Flights found by a search together with its progress events"""
+    
+    def __init__(self, flights: List[Dict[str, Any]], events: List[SearchEvent],
+                 outcomes: Dict[str, ProviderOutcome], stats: Dict[str, int]):
+        self.flights = flights
+        self.events = events
+        self.outcomes = outcomes
+        self.stats = stats
+
+
+class SearchUpdate:
+    """Best-so-far snapshot yielded by a streaming search.
+    
+    ``flights`` holds the current cheapest results after ``provider`` (None
+    for the final update) landed; the last update has ``done`` set and
+    carries the complete ``SearchResult``.
+    """
+    
+    def __init__(self, provider: Optional[str], flights: Sequence[Dict[str, Any]],
+                 stats: Dict[str, int], done: bool = False,
+                 result: Optional[SearchResult] = None):
+        self.provider = provider
+        self.flights = flights
+        self.stats = stats
+        self.done = done
+        self.result = result
+
+
+class SearchEngine:
+    """Runs provider calls in parallel under per-provider and overall deadlines"""
+    
+    def __init__(self, max_workers: int = 32):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='provider')
+    
+    def submit(self, task: ProviderTask,
+               context: Optional[contextvars.Context] = None) -> Future:
+        """Start a provider call in the background, in ``context`` (default: the caller's)"""
+        if context is None:
+            context = contextvars.copy_context()
+        if inspect.iscoroutinefunction(task.func):
+            return http_client.submit(task.func(), context)
+        return self.executor.submit(context.copy().run, task.func)
+    
+    def stream(self, tasks: List[ProviderTask], budget: float,
+               context: Optional[contextvars.Context] = None) -> Iterator[ProviderOutcome]:
+        """Run all tasks concurrently and yield each outcome as it settles.
+        
+        Each task is abandoned once its own timeout or the overall budget
+        expires, whichever comes first; late results are discarded. Closing
+        the generator early cancels whatever is still running. Tasks see
+        the context variables of ``context`` (default: the caller's).
+        """
+        start = time.monotonic()
+        futures = {self.submit(task, context): task for task in tasks}
+        deadlines = {
+            future: start + min(task.timeout, budget)
+            for future, task in futures.items()
+        }
+        pending = set(futures)
+        
+        try:
+            while pending:
+                now = time.monotonic()
+                for future in [f for f in pending if deadlines[f] <= now]:
+                    pending.discard(future)
+                    future.cancel()
+                    task = futures[future]
+                    yield ProviderOutcome(task.name, 'timeout', elapsed=now - start)
+                if not pending:
+                    break
+                
+                next_deadline = min(deadlines[f] for f in pending)
+                done, pending = wait(pending, timeout=max(0.0, next_deadline - now),
+                                     return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield self._outcome(futures[future], future, time.monotonic() - start)
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    def run(
+        self,
+        tasks: List[ProviderTask],
+        budget: float,
+        on_outcome: Optional[Callable[[ProviderOutcome], None]] = None
+    ) -> Dict[str, ProviderOutcome]:
+        """Run all tasks concurrently and collect whatever finished in time.
+        
+        ``on_outcome`` is called on the calling thread as each task settles.
+        """
+        outcomes: Dict[str, ProviderOutcome] = {}
+        for outcome in self.stream(tasks, budget):
+            outcomes[outcome.name] = outcome
+            if on_outcome:
+                on_outcome(outcome)
+        return outcomes
+    
+    @staticmethod
+    def _outcome(task: ProviderTask, future: Future, elapsed: float) -> ProviderOutcome:
+        error = future.exception()
+        if error is not None:
+            return ProviderOutcome(task.name, 'error', error=error, elapsed=elapsed)
+        return ProviderOutcome(task.name, 'ok', result=future.result(), elapsed=elapsed)
+
+
+# Global search engine instance
+search_engine = SearchEngine()
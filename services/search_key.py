@@ -0,0 +1,86 @@
+"""Canonical, hashed cache keys for flight searches."""
+import hashlib
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+DateLike = Union[str, date, datetime, None]
+
+
+def _iso_date(value: DateLike) -> Optional[str]:
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return datetime.strptime(str(value).strip()[:10], '%Y-%m-%d').date().isoformat()
+
+
+def _code(value: Optional[str]) -> Optional[str]:
+    return value.strip().upper() if value else None
+
+
+class SearchKey:
+    """Normalized search parameters with a stable hashed string form.
+    
+    Airport codes, cabin class and currency are upper-cased, dates become
+    ISO dates and adults an int, so equivalent searches share one entry
+    whichever provider or page built them. Parameters a provider does not
+    use are left as None.
+    
+    ``str(key)`` is ``search:<hash>`` over every parameter and is what the
+    cache tiers store. ``supersets`` lists broader searches whose results
+    contain this one's; ``restrict`` derives this search's results from
+    theirs (a non-stop search is the all-stops search without stopovers).
+    """
+    
+    __slots__ = ('origin', 'destination', 'departure_date', 'return_date', 'adults',
+                 'cabin_class', 'non_stop', 'currency', '_key')
+    
+    def __init__(self, origin: str, destination: str, departure_date: DateLike = None,
+                 return_date: DateLike = None, adults: Optional[int] = None,
+                 cabin_class: Optional[str] = None, non_stop: Optional[bool] = None,
+                 currency: Optional[str] = None):
+        self.origin = _code(origin)
+        self.destination = _code(destination)
+        self.departure_date = _iso_date(departure_date)
+        self.return_date = _iso_date(return_date)
+        self.adults = int(adults) if adults is not None else None
+        self.cabin_class = _code(cabin_class)
+        self.non_stop = bool(non_stop) if non_stop is not None else None
+        self.currency = _code(currency)
+        canonical = json.dumps(self.to_dict(), sort_keys=True, separators=(',', ':'))
+        self._key = 'search:' + hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:24]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Normalized parameters"""
+        return {name: getattr(self, name) for name in self.__slots__[:-1]}
+    
+    def replace(self, **changes: Any) -> 'SearchKey':
+        """Copy with some parameters changed"""
+        return SearchKey(**{**self.to_dict(), **changes})
+    
+    def supersets(self) -> Iterator['SearchKey']:
+        """Broader searches whose results include every result of this one"""
+        if self.non_stop:
+            yield self.replace(non_stop=False)
+    
+    def restrict(self, flights: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """This search's results out of the results of one of its ``supersets``"""
+        if self.non_stop:
+            return [flight for flight in flights if not flight.get('stops')]
+        return flights
+    
+    def __str__(self) -> str:
+        return self._key
+    
+    def __repr__(self) -> str:
+        params = ', '.join(f"{k}={v!r}" for k, v in self.to_dict().items() if v is not None)
+        return f"SearchKey({params})"
+    
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, SearchKey) and self._key == other._key
+    
+    def __hash__(self) -> int:
+        return hash(self._key)
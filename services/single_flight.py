@@ -0,0 +1,70 @@
+"""Request coalescing: concurrent calls for the same key share one execution."""
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time and shares its result.
+    
+    The first caller for a key (the leader) runs the function; callers
+    arriving while it is in flight wait for the leader and receive the
+    same result or exception.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self._tasks: Dict[Tuple[int, Hashable], asyncio.Task] = {}
+    
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Call ``fn`` once for all concurrent callers of ``key`` (threads)"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        
+        if not leader:
+            return future.result()
+        
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+    
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``fn`` once for all concurrent callers of ``key`` (same loop).
+        
+        The shared task is shielded, so one caller being cancelled (for
+        instance by its search deadline) does not abort the fetch for the
+        others.
+        """
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        task = self._tasks.get(task_key)
+        if task is None:
+            task = loop.create_task(fn())
+            self._tasks[task_key] = task
+            task.add_done_callback(lambda done: self._forget(task_key, done))
+        return await asyncio.shield(task)
+    
+    def _forget(self, task_key: Tuple[int, Hashable], task: asyncio.Task):
+        if self._tasks.get(task_key) is task:
+            del self._tasks[task_key]
+        if not task.cancelled():
+            # Mark the exception as retrieved when every waiter has gone away
+            task.exception()
+    
+    def in_flight(self) -> int:
+        """Number of keys currently being fetched"""
+        return len(self._calls) + len(self._tasks)
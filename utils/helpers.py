@@ -1,7 +1,10 @@
 """Helper utilities for formatting and data processing."""
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
+import numpy as np
 import pandas as pd
+from utils.ranking import top_k
+from utils.result_set import MISSING_INT, FlightResultSet
 
 class FlightFormatter:
     """Format flight data for display"""
@@ -43,28 +46,88 @@ class FlightFormatter:
             return dt_str
     
     @staticmethod
-    def flights_to_dataframe(flights: List[Dict[str, Any]]) -> pd.DataFrame:
-        """Convert flights list to pandas DataFrame"""
+    def _datetime_column(result_set: FlightResultSet, column: str,
+                         raw: pd.Series) -> np.ndarray:
+        """'YYYY-MM-DD HH:MM' from a wall-clock timestamp column; raw value if unknown"""
+        timestamps = result_set.columns[column]
+        formatted = np.char.replace(
+            np.datetime_as_string(timestamps.astype('datetime64[s]'), unit='m'), 'T', ' '
+        ).astype(object)
+        for index in np.flatnonzero(timestamps == MISSING_INT):
+            formatted[index] = FlightFormatter.format_datetime(raw.iat[index])
+        return formatted
+    
+    @staticmethod
+    def _duration_column(result_set: FlightResultSet, raw: pd.Series) -> np.ndarray:
+        """'Xh Ym' from the duration_minutes column; the raw duration if unparseable"""
+        minutes = result_set.columns['duration_minutes']
+        hours, rest = np.divmod(minutes, 60)
+        formatted = np.char.add(np.char.add(hours.astype(str), 'h '),
+                                np.char.add(rest.astype(str), 'm')).astype(object)
+        for index in np.flatnonzero(minutes == MISSING_INT):
+            formatted[index] = FlightFormatter.format_duration(raw.iat[index])
+        return formatted
+    
+    @staticmethod
+    def flights_to_frame(
+        flights: Union[FlightResultSet, List[Dict[str, Any]]]
+    ) -> pd.DataFrame:
+        """Convert flights to a typed DataFrame for sorting and charts.
+        
+        ``departure_time`` and ``arrival_time`` become (wall-clock)
+        datetimes and a nullable ``duration_minutes`` column is added next
+        to ``duration``; all three come from the result set's typed columns.
+        """
         if not flights:
             return pd.DataFrame()
         
-        df = pd.DataFrame(flights)
+        result_set = FlightResultSet.from_flights(flights)
+        df = pd.DataFrame(result_set.to_list())
         
-        # Format columns
-        if 'departure_time' in df.columns:
-            df['departure_time'] = df['departure_time'].apply(
-                FlightFormatter.format_datetime
-            )
+        for column, ts_column in (('departure_time', 'departure_ts'),
+                                  ('arrival_time', 'arrival_ts')):
+            if column in df.columns:
+                timestamps = result_set.columns[ts_column]
+                df[column] = pd.to_datetime(
+                    np.where(timestamps == MISSING_INT, np.iinfo(np.int64).min,
+                             timestamps).astype('datetime64[s]')
+                )
         
-        if 'arrival_time' in df.columns:
-            df['arrival_time'] = df['arrival_time'].apply(
-                FlightFormatter.format_datetime
+        if 'duration' in df.columns:
+            minutes = result_set.columns['duration_minutes']
+            df['duration_minutes'] = pd.array(
+                np.where(minutes == MISSING_INT, 0, minutes), dtype='Int64'
             )
+            df.loc[minutes == MISSING_INT, 'duration_minutes'] = pd.NA
+        
+        if 'price' in df.columns:
+            df['price'] = pd.to_numeric(df['price'], errors='coerce')
+        
+        return df
+    
+    @staticmethod
+    def flights_to_dataframe(
+        flights: Union[FlightResultSet, List[Dict[str, Any]]]
+    ) -> pd.DataFrame:
+        """Convert flights list to pandas DataFrame.
+        
+        Display strings are built from the result set's typed columns in
+        bulk; only values that could not be parsed go through the per-row
+        formatters, which pass them through as they came.
+        """
+        if not flights:
+            return pd.DataFrame()
+        
+        result_set = FlightResultSet.from_flights(flights)
+        df = pd.DataFrame(result_set.to_list())
+        
+        for column, ts_column in (('departure_time', 'departure_ts'),
+                                  ('arrival_time', 'arrival_ts')):
+            if column in df.columns:
+                df[column] = FlightFormatter._datetime_column(result_set, ts_column, df[column])
         
         if 'duration' in df.columns:
-            df['duration'] = df['duration'].apply(
-                FlightFormatter.format_duration
-            )
+            df['duration'] = FlightFormatter._duration_column(result_set, df['duration'])
         
         if 'price' in df.columns:
             df['price'] = df['price'].round(2)
@@ -72,7 +135,10 @@ class FlightFormatter:
         return df
     
     @staticmethod
-    def get_cheapest_flights(flights: List[Dict[str, Any]], n: int = 10) -> List[Dict[str, Any]]:
+    def get_cheapest_flights(
+        flights: Union[FlightResultSet, List[Dict[str, Any]]], n: int = 10
+    ) -> List[Dict[str, Any]]:
         """Get n cheapest flights"""
-        sorted_flights = sorted(flights, key=lambda x: x.get('price', float('inf')))
-        return sorted_flights[:n]
+        if isinstance(flights, FlightResultSet):
+            return flights.top_k(n, by='price').to_list()
+        return top_k(flights, n)
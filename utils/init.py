@@ -1,5 +1,7 @@
 """Utils package initialization."""
 from .helpers import FlightFormatter
+from .ranking import LiveRanking, top_k
+from .result_set import FlightResultSet
 from .validators import FlightValidator
 
-__all__ = ['FlightFormatter', 'FlightValidator']
+__all__ = ['FlightFormatter', 'FlightResultSet', 'FlightValidator', 'LiveRanking', 'top_k']
@@ -0,0 +1,75 @@
+"""Bounded top-k selection and live rankings of flights."""
+import heapq
+import itertools
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+SEGMENTS = ('all', 'direct', 'with_stops')
+
+
+def price_key(flight: Dict[str, Any]) -> float:
+    """Sort key for the cheapest-first order; unknown prices go last"""
+    price = flight.get('price')
+    return price if isinstance(price, (int, float)) else float('inf')
+
+
+def flight_segment(flight: Dict[str, Any]) -> str:
+    """'direct' or 'with_stops'"""
+    return 'direct' if (flight.get('stops', 0) or 0) == 0 else 'with_stops'
+
+
+def top_k(flights: Iterable[Dict[str, Any]], k: int,
+          key: Callable[[Dict[str, Any]], float] = price_key) -> List[Dict[str, Any]]:
+    """The ``k`` smallest flights by ``key`` in O(n log k), ties in input order"""
+    if k <= 0:
+        return []
+    return heapq.nsmallest(k, flights, key=key)
+
+
+class LiveRanking:
+    """Cheapest ``k`` flights overall and per segment, updated as batches land.
+    
+    Each segment keeps a bounded max-heap of its ``k`` best flights, so
+    adding a flight costs O(log k) and the ranking never re-sorts what it
+    has already seen. Flights with the same key keep their arrival order.
+    """
+    
+    def __init__(self, k: int, key: Callable[[Dict[str, Any]], float] = price_key):
+        self.k = k
+        self.key = key
+        self.counts: Dict[str, int] = dict.fromkeys(SEGMENTS, 0)
+        self._heaps: Dict[str, list] = {segment: [] for segment in SEGMENTS}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+    
+    def _push(self, segment: str, entry: tuple):
+        heap = self._heaps[segment]
+        self.counts[segment] += 1
+        if len(heap) < self.k:
+            heapq.heappush(heap, entry)
+        elif heap and entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    
+    def add(self, flight: Dict[str, Any]):
+        """Rank one flight"""
+        self.extend((flight,))
+    
+    def extend(self, flights: Iterable[Dict[str, Any]]):
+        """Rank a batch of flights, e.g. one provider's results"""
+        with self._lock:
+            for flight in flights:
+                # Negated key and sequence: the heap top is the worst kept flight
+                entry = (-self.key(flight), -next(self._sequence), flight)
+                self._push('all', entry)
+                self._push(flight_segment(flight), entry)
+    
+    def best(self, n: Optional[int] = None, segment: str = 'all') -> List[Dict[str, Any]]:
+        """Cheapest ``n`` flights (at most ``k``) of a segment, best first"""
+        with self._lock:
+            entries = sorted(self._heaps[segment], reverse=True)
+        if n is not None:
+            entries = entries[:n]
+        return [flight for _, _, flight in entries]
+    
+    def __len__(self) -> int:
+        return self.counts['all']
@@ -0,0 +1,229 @@
+"""Columnar container for flight search results."""
+import re
+import warnings
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+_DURATION_RE = re.compile(r'PT(?:(\d+)H)?(?:(\d+)M)?')
+
+# Sentinel for unknown integer values (durations, timestamps)
+MISSING_INT = -1
+
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+
+
+def parse_duration_minutes(duration: Any) -> int:
+    """Minutes in an ISO 8601 duration like 'PT2H35M', or MISSING_INT"""
+    if not isinstance(duration, str):
+        return MISSING_INT
+    match = _DURATION_RE.fullmatch(duration.strip())
+    if not match or not any(match.groups()):
+        return MISSING_INT
+    hours, minutes = match.groups()
+    return int(hours or 0) * 60 + int(minutes or 0)
+
+
+def parse_timestamp(value: Any) -> int:
+    """Seconds since the epoch of the wall-clock time of an ISO 8601 datetime.
+    
+    A UTC offset is dropped, not applied: '10:00+02:00' stays 10:00, the
+    local time travellers see. Returns MISSING_INT if unparseable.
+    """
+    if not isinstance(value, str) or not value or value == 'N/A':
+        return MISSING_INT
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return MISSING_INT
+    return (parsed.replace(tzinfo=None) - _EPOCH) // _SECOND
+
+
+
+def parse_timestamps(values: Sequence[Any]) -> np.ndarray:
+    """``parse_timestamp`` of every value, parsed in bulk when they allow it.
+    
+    numpy parses offset-free ISO strings in one call; anything it rejects
+    or would convert (offsets, 'N/A', non-strings) goes through the
+    per-value parser.
+    """
+    if all(type(value) is str for value in values):
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')
+                parsed = np.array(values, dtype='datetime64[s]')
+        except (ValueError, UserWarning):
+            pass
+        else:
+            return np.where(np.isnat(parsed), MISSING_INT, parsed.astype(np.int64))
+    return np.fromiter(map(parse_timestamp, values), dtype=np.int64, count=len(values))
+
+class FlightResultSet:
+    """Flight results stored column-wise in NumPy arrays.
+    
+    The original flight dicts are kept (as an object array) for display,
+    while price, stops, duration and times live in typed columns so every
+    filter, sort, top-k and aggregate is vectorized. Behaves like a
+    read-only list of flight dicts: ``len``, iteration, indexing, truth.
+    """
+    
+    COLUMNS = ('price', 'stops', 'duration_minutes', 'departure_ts', 'arrival_ts')
+    
+    def __init__(self, records: np.ndarray, columns: Dict[str, np.ndarray]):
+        self._records = records
+        self.columns = columns
+    
+    @classmethod
+    def from_flights(cls, flights: Union['FlightResultSet', Iterable[Dict[str, Any]]]) -> 'FlightResultSet':
+        """Build a result set from flight dicts (a result set is returned as is)"""
+        if isinstance(flights, FlightResultSet):
+            return flights
+        
+        flights = list(flights)
+        records = np.empty(len(flights), dtype=object)
+        records[:] = flights
+        
+        price = np.fromiter(
+            (f.get('price') if isinstance(f.get('price'), (int, float)) else np.nan
+             for f in flights),
+            dtype=np.float64, count=len(flights)
+        )
+        stops = np.fromiter((int(f.get('stops', 0) or 0) for f in flights),
+                            dtype=np.int16, count=len(flights))
+        duration = np.fromiter((parse_duration_minutes(f.get('duration')) for f in flights),
+                               dtype=np.int32, count=len(flights))
+        departure = parse_timestamps([f.get('departure_time') for f in flights])
+        arrival = parse_timestamps([f.get('arrival_time') for f in flights])
+        
+        return cls(records, {
+            'price': price,
+            'stops': stops,
+            'duration_minutes': duration,
+            'departure_ts': departure,
+            'arrival_ts': arrival
+        })
+    
+    @classmethod
+    def empty(cls) -> 'FlightResultSet':
+        """A result set without flights"""
+        return cls.from_flights([])
+    
+    @classmethod
+    def concat(cls, result_sets: Sequence['FlightResultSet']) -> 'FlightResultSet':
+        """Merge several result sets into one"""
+        result_sets = [cls.from_flights(rs) for rs in result_sets]
+        if not result_sets:
+            return cls.empty()
+        return cls(
+            np.concatenate([rs._records for rs in result_sets]),
+            {name: np.concatenate([rs.columns[name] for rs in result_sets])
+             for name in cls.COLUMNS}
+        )
+    
+    # ---- list-like access ----
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    def __bool__(self) -> bool:
+        return len(self._records) > 0
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._records)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(np.arange(len(self))[index])
+        return self._records[index]
+    
+    def __repr__(self) -> str:
+        return f"FlightResultSet({len(self)} flights)"
+    
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Flight dicts as a plain list"""
+        return self._records.tolist()
+    
+    def column(self, name: str) -> np.ndarray:
+        """One typed column (read-only view)"""
+        return self.columns[name]
+    
+    # ---- vectorized operations ----
+    
+    def take(self, indices: np.ndarray) -> 'FlightResultSet':
+        """Subset by row indices, in the given order"""
+        return FlightResultSet(
+            self._records[indices],
+            {name: values[indices] for name, values in self.columns.items()}
+        )
+    
+    def filter(self, mask: np.ndarray) -> 'FlightResultSet':
+        """Rows where a boolean mask is true"""
+        return self.take(np.flatnonzero(mask))
+    
+    def where(self, non_stop: bool = False, max_stops: Optional[int] = None,
+              max_price: Optional[float] = None) -> 'FlightResultSet':
+        """Rows matching the common search filters"""
+        mask = np.ones(len(self), dtype=bool)
+        if non_stop:
+            mask &= self.columns['stops'] == 0
+        if max_stops is not None:
+            mask &= self.columns['stops'] <= max_stops
+        if max_price is not None:
+            mask &= self.columns['price'] <= max_price
+        return self.filter(mask)
+    
+    def direct(self) -> 'FlightResultSet':
+        """Non-stop flights"""
+        return self.filter(self.columns['stops'] == 0)
+    
+    def with_stops(self) -> 'FlightResultSet':
+        """Flights with at least one stop"""
+        return self.filter(self.columns['stops'] > 0)
+    
+    def _sort_key(self, by: str, descending: bool = False) -> np.ndarray:
+        """Ascending sort key for a column with unknown values mapped last"""
+        values = self.columns[by]
+        if values.dtype.kind == 'f':
+            missing, values = np.isnan(values), values
+        else:
+            missing, values = values == MISSING_INT, values.astype(np.float64)
+        if descending:
+            values = -values
+        return np.where(missing, np.inf, values)
+    
+    def sort_by(self, by: str = 'price', descending: bool = False) -> 'FlightResultSet':
+        """Stable sort on a column; unknown values go last"""
+        return self.take(np.argsort(self._sort_key(by, descending), kind='stable'))
+    
+    def top_k(self, k: int, by: str = 'price') -> 'FlightResultSet':
+        """The ``k`` smallest rows by a column, sorted, in O(n + k log k)"""
+        n = len(self)
+        if k <= 0 or n == 0:
+            return self.take(np.arange(0))
+        key = self._sort_key(by)
+        if k < n:
+            candidates = np.argpartition(key, k - 1)[:k]
+        else:
+            candidates = np.arange(n)
+        order = candidates[np.lexsort((candidates, key[candidates]))]
+        return self.take(order)
+    
+    def count_direct(self) -> int:
+        """Number of non-stop flights"""
+        return int(np.count_nonzero(self.columns['stops'] == 0))
+    
+    def price_stats(self) -> Dict[str, Optional[float]]:
+        """Count, min, mean, max and standard deviation of known positive prices"""
+        price = self.columns['price']
+        valid = price[~np.isnan(price) & (price > 0)]
+        if valid.size == 0:
+            return {'count': 0, 'min': None, 'mean': None, 'max': None, 'std': None}
+        return {
+            'count': int(valid.size),
+            'min': float(valid.min()),
+            'mean': float(valid.mean()),
+            'max': float(valid.max()),
+            'std': float(valid.std(ddof=1)) if valid.size > 1 else 0.0
+        }